@@ -0,0 +1,172 @@
+"""Build and query the local vector stores at 1k to 1M 768-dim vectors.
+
+The flat store is measured at every quantization level, with recall@10 against
+exact search. The vectors are drawn around random centroids so that, like
+embeddings, they have meaningful neighbours, and are generated in blocks so
+that 1M vectors (3 GB) never have to be held twice. The memory store is skipped
+when it would not fit in the available RAM: it doubles its array as it grows
+and so needs twice the vectors' size. The embedded Qdrant is pure Python and
+keeps every point as Python objects, so it is only measured up to `MAX_QDRANT`
+points (62s to build and 410 ms per search at 100k).
+
+With "transient" as the first argument it instead compares the in-memory stores
+used for the files of a chat at 10 to 20k points, to find where handing over to
+Qdrant would pay off.
+
+    python benchmarks/vector_store.py [transient] [size ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from mirageml.commands.utils import manifest
+from mirageml.commands.utils.common import normalize
+from mirageml.commands.utils.vector_store import (
+    QUANTIZATION_LEVELS,
+    FlatVectorStore,
+    MemoryVectorStore,
+    QdrantVectorStore,
+)
+
+MAX_QDRANT = 100_000
+DIM, NUM_QUERIES, LIMIT, BLOCK = 768, 20, 10, 10_000
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def available_memory():
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def make_centroids(size):
+    return np.random.default_rng(size).standard_normal((max(size // 100, 1), DIM)).astype(np.float32)
+
+
+def make_blocks(size):
+    # The same (start, vectors) blocks on every call, without keeping them around
+    centroids = make_centroids(size)
+    for start in range(0, size, BLOCK):
+        block_rng = np.random.default_rng((size, start))
+        num = min(BLOCK, size - start)
+        noise = block_rng.standard_normal((num, DIM), dtype=np.float32)
+        yield start, centroids[block_rng.integers(len(centroids), size=num)] + noise
+
+
+def make_vectors(size):
+    return np.concatenate([vectors for _, vectors in make_blocks(size)])
+
+
+def exact_top(size, queries):
+    queries = normalize(queries)
+    best_scores = np.full((len(queries), LIMIT), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), LIMIT), dtype=np.int64)
+    for start, vectors in make_blocks(size):
+        scores = np.concatenate([best_scores, queries @ normalize(vectors).T], axis=1)
+        ids = np.concatenate(
+            [best_ids, np.broadcast_to(np.arange(start, start + len(vectors)), scores[:, LIMIT:].shape)], axis=1
+        )
+        top = np.argpartition(-scores, LIMIT - 1, axis=1)[:, :LIMIT]
+        best_scores, best_ids = np.take_along_axis(scores, top, 1), np.take_along_axis(ids, top, 1)
+    return [set(ids.tolist()) for ids in best_ids]
+
+
+def run(store, size, queries, exact, quantization="none"):
+    start_time = time.perf_counter()
+    store.create_collection("bench", DIM, quantization=quantization)
+    for start, vectors in make_blocks(size):
+        points = (
+            (j, vector, {"source": f"file{j % 1000}", "chunk": j}) for j, vector in enumerate(vectors, start=start)
+        )
+        store.upsert("bench", points, batch_size=1024)
+    build = time.perf_counter() - start_time
+    store.search("bench", queries[0], LIMIT)
+    found = []
+    start_time = time.perf_counter()
+    for query in queries:
+        found.append({int(hit["id"]) for hit in store.search("bench", query, LIMIT)})
+    search = (time.perf_counter() - start_time) / NUM_QUERIES
+    recall = np.mean([len(ids & top) / LIMIT for ids, top in zip(found, exact)])
+    return build, search, recall
+
+
+def bench_transient(sizes, rng):
+    for size in sizes:
+        vectors = make_vectors(size)
+        queries = vectors[rng.integers(size, size=NUM_QUERIES)]
+        exact = exact_top(size, queries)
+        for store in (MemoryVectorStore(), QdrantVectorStore(QdrantClient(location=":memory:"))):
+            build, search, _ = run(store, size, queries, exact)
+            print(f"{size:>7} {store.name:<7} build {build * 1000:8.1f} ms  search {search * 1000:7.2f} ms")
+
+
+def bench_stores(sizes, rng):
+    for size in sizes:
+        # Queries are new points around the clusters, like questions about indexed content
+        centroids = make_centroids(size)
+        queries = centroids[rng.integers(len(centroids), size=NUM_QUERIES)]
+        queries = queries + rng.standard_normal((NUM_QUERIES, DIM)).astype(np.float32)
+        exact = exact_top(size, queries)
+        for quantization in QUANTIZATION_LEVELS:
+            root = tempfile.mkdtemp()
+            manifest.SOURCES_DIR = root
+            try:
+                flat = FlatVectorStore()
+                build, search, recall = run(flat, size, queries, exact, quantization)
+                flat.close()
+                scanned = size * {"none": DIM * 4, "int8": DIM + 4, "binary": DIM // 8}[quantization]
+                print(
+                    f"{size:>7} flat {quantization:<6}  build {build:6.1f}s  search {search * 1000:7.2f} ms  "
+                    f"recall {recall:5.3f}  scanned {scanned / 1e6:6.1f} MB  disk {directory_size(root) / 1e6:6.1f} MB"
+                )
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        # The matrix doubles as it grows, so it peaks at about twice its final size
+        memory = available_memory()
+        if memory is None or 2 * size * DIM * 4 < memory:
+            store = MemoryVectorStore()
+            build, search, recall = run(store, size, queries, exact)
+            store.close()
+            print(f"{size:>7} memory       build {build:6.1f}s  search {search * 1000:7.2f} ms  recall {recall:5.3f}")
+            del store
+        else:
+            print(
+                f"{size:>7} memory       skipped: needs {2 * size * DIM * 4 / 1e9:.1f} GB, {memory / 1e9:.1f} GB free"
+            )
+        if size <= MAX_QDRANT:
+            root = tempfile.mkdtemp()
+            try:
+                qdrant = QdrantVectorStore(QdrantClient(path=root))
+                build, search, recall = run(qdrant, size, queries, exact)
+                qdrant.close()
+                print(
+                    f"{size:>7} qdrant       build {build:6.1f}s  search {search * 1000:7.2f} ms  "
+                    f"recall {recall:5.3f}  disk {directory_size(root) / 1e6:6.1f} MB"
+                )
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        else:
+            print(f"{size:>7} qdrant       skipped above {MAX_QDRANT} points")
+
+
+def main():
+    transient = sys.argv[1:2] == ["transient"]
+    sizes = [int(x) for x in sys.argv[1 + transient :]]
+    rng = np.random.default_rng(0)
+    if transient:
+        bench_transient(sizes or [10, 100, 1_000, 5_000, 20_000], rng)
+    else:
+        bench_stores(sizes or [1_000, 10_000, 100_000, 1_000_000], rng)
+
+
+if __name__ == "__main__":
+    main()
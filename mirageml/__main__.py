@@ -27,18 +27,25 @@ list_app = typer.Typer(name="list", help="List resources", no_args_is_help=True)
 sync_app = typer.Typer(name="sync", help="Sync resources", no_args_is_help=True)
 delete_app = typer.Typer(name="delete", help="Delete resources", no_args_is_help=True)
 remove_app = typer.Typer(name="remove", help="Remove resources", no_args_is_help=True)
+cache_app = typer.Typer(name="cache", help="Manage the embedding cache", no_args_is_help=True)
 
 
 app.add_typer(config_app, rich_help_panel="Utils and Configs")
+app.add_typer(cache_app, rich_help_panel="Utils and Configs")
 app.add_typer(add_app, rich_help_panel="Manage Resources")
 app.add_typer(list_app, rich_help_panel="Manage Resources")
 app.add_typer(delete_app, rich_help_panel="Manage Resources")
-app.add_typer(sync_app, rich_help_panel="Manage Resources", hidden=True)
+app.add_typer(sync_app, rich_help_panel="Manage Resources")
 app.add_typer(remove_app, rich_help_panel="Manage Resources", hidden=True)
 
 
 @app.callback()
-def main(ctx: typer.Context):
+def main(
+    ctx: typer.Context,
+    stats: bool = typer.Option(
+        False, "--stats", help="Print embedding model loads and remote call latencies when the command ends"
+    ),
+):
     import keyring
     import segment.analytics as analytics
 
@@ -63,6 +70,14 @@ def main(ctx: typer.Context):
         full_command = " ".join(sys.argv[1:])
         analytics.track(user_id, "command", {"command": full_command})
 
+    if stats:
+        import atexit
+
+        from .commands import show_runtime_stats
+
+        # atexit also covers commands that leave through sys.exit, like typing "exit" in a chat
+        atexit.register(show_runtime_stats)
+
 
 @app.command(name="help", hidden=True)
 def custom_help():
@@ -125,6 +140,10 @@ def chat_command(
     ),
     sources: List[str] = typer.Option(None, "--sources", "-s", help=generate_chat_help_text()),
     sp: str = typer.Option(None, "--system-prompt", "-sp", help="Name of the system prompt to use"),
+    workers: int = typer.Option(
+        None, "--workers", help="Number of processes used to embed local files (default: embedding_workers config)"
+    ),
+    report_memory: bool = typer.Option(False, "--report-memory", help="Report the peak memory used while indexing"),
 ):
     """Chat with MirageML"""
     for url in urls:
@@ -147,7 +166,7 @@ def chat_command(
 
     from .commands import chat
 
-    chat(files=filepaths, urls=urls, sources=sources, sp=sp)
+    chat(files=filepaths, urls=urls, sources=sources, sp=sp, workers=workers, report_memory=report_memory)
 
 
 @config_app.command(name="show")
@@ -176,6 +195,22 @@ def set_config_command():
     set_config()
 
 
+@cache_app.command(name="stats")
+def cache_stats_command():
+    """Show embedding cache statistics"""
+    from .commands import show_cache_stats
+
+    show_cache_stats()
+
+
+@cache_app.command(name="clear")
+def clear_cache_command():
+    """Delete all cached embeddings"""
+    from .commands import clear_cache
+
+    clear_cache()
+
+
 # List Commands
 @list_app.command(name="sp", hidden=True)
 def list_system_prompts():
@@ -210,7 +245,31 @@ def add_system_prompt_command(name: str = typer.Argument(default="", help="Name
 
 
 @add_app.command(name="source")
-def add_source_command(link: str = typer.Argument(default="", help="Link to the source")):
+def add_source_command(
+    link: str = typer.Argument(default="", help="Link to the source"),
+    workers: int = typer.Option(
+        None, "--workers", help="Number of processes used to embed the source (default: embedding_workers config)"
+    ),
+    report_memory: bool = typer.Option(False, "--report-memory", help="Report the peak memory used while indexing"),
+    quantization: str = typer.Option(
+        None,
+        "--quantization",
+        help="Store int8 or binary codes of the vectors, flat backend only: none, int8 or binary (default: quantization config)",
+    ),
+    embedding_model: str = typer.Option(
+        None,
+        "--embedding-model",
+        help="Embedding model of the source, e.g. BAAI/bge-small-en-v1.5 (default: embedding_model config)",
+    ),
+    reducer: str = typer.Option(
+        None,
+        "--reducer",
+        help="Reduce the stored vectors: none, pca or truncate (Matryoshka models only) (default: reducer config)",
+    ),
+    reduced_dim: int = typer.Option(
+        None, "--reduced-dim", help="Dimensions kept by the reducer (default: reduced_dim config)"
+    ),
+):
     """Add a new source"""
     from .commands import add_source
 
@@ -230,7 +289,16 @@ def add_source_command(link: str = typer.Argument(default="", help="Link to the
     if name in ["docs", "www", "en", "platform", "blog"]:
         name = parsed_url.netloc.split(".")[1]
     name = input(f"Name for the source [default: {name}]: ") or name
-    add_source(name, link)
+    add_source(
+        name,
+        link,
+        workers=workers,
+        report_memory=report_memory,
+        quantization=quantization,
+        embedding_model=embedding_model,
+        reducer=reducer,
+        reduced_dim=reduced_dim,
+    )
 
 
 @add_app.command(name="sources", hidden=True)
@@ -270,6 +338,23 @@ def add_models_command(links: List[str] = typer.Argument(...)):
     return
 
 
+# Sync Commands
+@sync_app.command(name="source")
+def sync_source_command(
+    path: str = typer.Argument(default=".", help="Path to the directory to keep indexed"),
+    interval: float = typer.Option(1.0, "--interval", help="Seconds between polls for changes"),
+    debounce: float = typer.Option(2.0, "--debounce", help="Seconds without changes before re-indexing"),
+    workers: int = typer.Option(
+        None, "--workers", help="Number of processes used to embed changed files (default: embedding_workers config)"
+    ),
+    report_memory: bool = typer.Option(False, "--report-memory", help="Report the peak memory used while indexing"),
+):
+    """Watch a directory and keep its local source up to date"""
+    from .commands import sync_source
+
+    sync_source(path, interval=interval, debounce=debounce, workers=workers, report_memory=report_memory)
+
+
 # Delete Commands
 @delete_app.command(name="sp", hidden=True)
 def delete_system_prompt(name: str = typer.Argument(default="", help="Name of the system prompt")):
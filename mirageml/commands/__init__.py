@@ -5,6 +5,7 @@ It initializes the module and imports the necessary modules.
 from .add_model import add_model
 from .add_source import add_source
 from .add_system_prompt import add_system_prompt
+from .cache import clear_cache, show_cache_stats, show_runtime_stats
 from .chat import chat
 from .config import set_config, show_config
 from .delete_source import delete_source
@@ -14,6 +15,7 @@ from .list_sources import list_sources
 from .list_system_prompts import list_system_prompts
 from .login import login
 from .profile import profile
+from .sync_source import sync_source
 from .tutorial import tutorial
 
 __all__ = [
@@ -31,4 +33,8 @@ __all__ = [
     "delete_source",
     "delete_system_prompt",
     "tutorial",
+    "show_cache_stats",
+    "clear_cache",
+    "show_runtime_stats",
+    "sync_source",
 ]
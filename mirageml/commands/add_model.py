@@ -1,8 +1,7 @@
 import keyring
-import requests
 import typer
 
-from ..constants import FINETUNE_CREATE_ENDPOINT, SERVICE_ID, get_headers
+from ..constants import FINETUNE_CREATE_ENDPOINT, SERVICE_ID, get_headers, http_client
 
 
 def fix_name(name):
@@ -28,7 +27,8 @@ def add_model(model_name, links):
     user_id = keyring.get_password(SERVICE_ID, "user_id")
     json_data = {"user_id": user_id, "finetune_model_name": model_name, "links": links}
 
-    requests.post(FINETUNE_CREATE_ENDPOINT, json=json_data, headers=get_headers())
+    # Not retried: a retry after a server error could start a second finetune
+    http_client.post(FINETUNE_CREATE_ENDPOINT, json=json_data, headers=get_headers(), retries=0)
     typer.secho(
         f"Creating Finetuned Model: {model_name}. You will receive an email once its ready!",
         fg=typer.colors.GREEN,
@@ -15,7 +15,17 @@ def fix_name(name):
     return name
 
 
-def add_web_source(link, name=None, remote=False):
+def add_web_source(
+    link,
+    name=None,
+    remote=False,
+    workers=None,
+    report_memory=False,
+    quantization=None,
+    embedding_model=None,
+    reducer=None,
+    reduced_dim=None,
+):
     config = load_config()
     remote = False if config["local_mode"] else True
 
@@ -28,11 +38,29 @@ def add_web_source(link, name=None, remote=False):
         create_remote_qdrant_db(collection_name=name, link=link)
     else:
         print(f"Indexing {link}...")
-        create_local_qdrant_db(collection_name=name, link=link)
+        create_local_qdrant_db(
+            collection_name=name,
+            link=link,
+            workers=workers,
+            report_memory=report_memory,
+            quantization=quantization,
+            embedding_model=embedding_model,
+            reducer=reducer,
+            reduced_dim=reduced_dim,
+        )
     return name
 
 
-def add_local_source(path=None, name=None):
+def add_local_source(
+    path=None,
+    name=None,
+    workers=None,
+    report_memory=False,
+    quantization=None,
+    embedding_model=None,
+    reducer=None,
+    reduced_dim=None,
+):
     if path == "local":
         path = "."
     print("Indexing Local Files...")
@@ -41,14 +69,48 @@ def add_local_source(path=None, name=None):
     collection_name = os.path.abspath(path) if name is None else name
     collection_name = fix_name(collection_name)
 
-    create_local_qdrant_db(collection_name=collection_name, path=path)
+    create_local_qdrant_db(
+        collection_name=collection_name,
+        path=path,
+        workers=workers,
+        report_memory=report_memory,
+        quantization=quantization,
+        embedding_model=embedding_model,
+        reducer=reducer,
+        reduced_dim=reduced_dim,
+    )
     return collection_name
 
 
-def add_source(name, link):
+def add_source(
+    name,
+    link,
+    workers=None,
+    report_memory=False,
+    quantization=None,
+    embedding_model=None,
+    reducer=None,
+    reduced_dim=None,
+):
     name = fix_name(name)
 
     if link:
-        add_web_source(link, name)
+        add_web_source(
+            link,
+            name,
+            workers=workers,
+            report_memory=report_memory,
+            quantization=quantization,
+            embedding_model=embedding_model,
+            reducer=reducer,
+            reduced_dim=reduced_dim,
+        )
     else:
-        add_local_source()
+        add_local_source(
+            workers=workers,
+            report_memory=report_memory,
+            quantization=quantization,
+            embedding_model=embedding_model,
+            reducer=reducer,
+            reduced_dim=reduced_dim,
+        )
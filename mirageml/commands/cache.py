@@ -0,0 +1,70 @@
+import typer
+
+
+def _format_bytes(num_bytes):
+    for unit in ["B", "KB", "MB"]:
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def show_cache_stats():
+    from .utils.embedding_cache import get_embedding_cache
+
+    cache = get_embedding_cache()
+    if cache is None:
+        typer.secho(
+            "The embedding cache is disabled. Enable it with `embedding_cache` in the config.", fg=typer.colors.RED
+        )
+        return
+
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{100 * stats['hits'] / lookups:.1f}%" if lookups else "n/a"
+
+    typer.secho("Embedding Cache:", fg=typer.colors.BRIGHT_GREEN, bold=True)
+    print(f"* Path: {stats['path']}")
+    print(f"* Entries: {stats['entries']}")
+    print(f"* Size: {_format_bytes(stats['bytes'])} / {_format_bytes(stats['max_bytes'])}")
+    print(f"* Hits: {stats['hits']}, Misses: {stats['misses']} (hit rate: {hit_rate})")
+    print(f"* Evictions: {stats['evictions']}")
+    for model, model_stats in stats["models"].items():
+        print(f"* {model}: {model_stats['entries']} entries, {_format_bytes(model_stats['bytes'])}")
+
+
+def show_runtime_stats():
+    """Print the embedding model and remote call statistics of this process."""
+    import sys
+
+    from ..constants import http_client
+
+    # Only report models if something loaded them, importing llm here would pull in fastembed
+    llm = sys.modules.get("mirageml.commands.utils.llm")
+    model_stats = llm.embedding_models.stats() if llm else {}
+    if model_stats:
+        typer.secho("Embedding Models:", fg=typer.colors.BRIGHT_GREEN, bold=True)
+        for model, stats in model_stats.items():
+            state = "loaded" if stats["loaded"] else "unloaded"
+            print(f"* {model}: {stats['loads']} loads ({stats['load_time']:.1f}s), {stats['reuses']} reuses, {state}")
+
+    call_stats = http_client.stats()
+    if call_stats:
+        typer.secho("Remote Calls:", fg=typer.colors.BRIGHT_GREEN, bold=True)
+        for url, stats in call_stats.items():
+            print(
+                f"* {url}: {stats['requests']} requests, {stats['retries']} retries, {stats['failures']} failures, "
+                f"mean {1000 * stats['mean_time']:.0f} ms, max {1000 * stats['max_time']:.0f} ms"
+            )
+
+
+def clear_cache():
+    from .utils.embedding_cache import get_embedding_cache
+
+    cache = get_embedding_cache()
+    if cache is None:
+        typer.secho("The embedding cache is disabled.", fg=typer.colors.RED)
+        return
+
+    cache.clear()
+    typer.secho("Cleared the embedding cache", fg=typer.colors.BRIGHT_GREEN, bold=True)
@@ -19,15 +19,24 @@ from .utils.codeblocks import (
 )
 from .utils.custom_inputs import multiline_input
 from .utils.llm import llm_call
+from .utils.transient import TransientSources
 from .utils.type_check import is_convertable_to_int
 
 console = Console()
-config = load_config()
 
 
-def chat(files: list[str] = [], urls: list[str] = [], sources: list[str] = [], sp: str = ""):
+def chat(
+    files: list[str] = [],
+    urls: list[str] = [],
+    sources: list[str] = [],
+    sp: str = "",
+    workers: int = None,
+    report_memory: bool = False,
+):
+    config = load_config()
     # Beginning of the chat sequence
-    transient_sources = []
+    # Files and urls are embedded once for the whole session and re-read when a file changes
+    transient_sources = TransientSources()
     if files or urls or sources:
         index_local = False
         if "local" in sources:
@@ -36,7 +45,7 @@ def chat(files: list[str] = [], urls: list[str] = [], sources: list[str] = [], s
 
         for file in files:
             if os.path.isdir(file):
-                sources.append(add_local_source(file))
+                sources.append(add_local_source(file, workers=workers, report_memory=report_memory))
                 files.remove(file)
 
         local_sources, remote_sources = get_sources()
@@ -51,7 +60,7 @@ def chat(files: list[str] = [], urls: list[str] = [], sources: list[str] = [], s
                 sources.remove(source)
 
         if index_local:
-            sources.append(add_local_source("local"))
+            sources.append(add_local_source("local", workers=workers, report_memory=report_memory))
 
         if files or urls:
             from .utils.local_source import crawl_files
@@ -76,7 +85,7 @@ def chat(files: list[str] = [], urls: list[str] = [], sources: list[str] = [], s
                     )
                     data, metadata = extractor(source)
                     if data:
-                        transient_sources.append((data, metadata))
+                        transient_sources.add(source, data, metadata, path=source if source in files else None)
 
     chat_history = [{"role": "system", "content": "You are a helpful assistant."}]
     while True:
@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 
 import typer
 
@@ -12,6 +13,8 @@ def show_config():
 
 
 def load_config():
+    from .utils.local_source import DEFAULT_IGNORED_DIRS
+
     config_path = os.path.expanduser("~/.mirageml.json")
     curr_config = {}
     if os.path.exists(config_path):
@@ -23,18 +26,49 @@ def load_config():
         "keep_files_local": curr_config.get("keep_files_local", True),
         "local": curr_config.get("local", []),
         "remote": curr_config.get("remote", []),
+        "sources_updated": curr_config.get("sources_updated", 0),
+        "source_catalog_ttl": curr_config.get("source_catalog_ttl", 300),
         "system_prompts": curr_config.get("system_prompts", []),
         "custom_models": curr_config.get("custom_models", []),
         "openai_key": curr_config.get("openai_key", ""),
+        "embedding_idle_timeout": curr_config.get("embedding_idle_timeout", 300),
+        "embedding_cache": curr_config.get("embedding_cache", True),
+        "embedding_cache_max_mb": curr_config.get("embedding_cache_max_mb", 1024),
+        "embedding_batch_size": curr_config.get("embedding_batch_size", 256),
+        "embedding_workers": curr_config.get("embedding_workers", 1),
+        "upsert_batch_size": curr_config.get("upsert_batch_size", 512),
+        "upload_parallel": curr_config.get("upload_parallel", 1),
+        "git_enumeration": curr_config.get("git_enumeration", True),
+        "ignored_dirs": curr_config.get("ignored_dirs", sorted(DEFAULT_IGNORED_DIRS)),
+        "max_file_kb": curr_config.get("max_file_kb", 1024),
+        "max_total_mb": curr_config.get("max_total_mb", 1024),
+        "chunk_max_tokens": curr_config.get("chunk_max_tokens", 510),
+        "chunk_overlap_tokens": curr_config.get("chunk_overlap_tokens", 20),
+        "code_chunking": curr_config.get("code_chunking", True),
+        "dedup": curr_config.get("dedup", True),
+        "dedup_max_distance": curr_config.get("dedup_max_distance", 3),
+        "vector_store_backend": curr_config.get("vector_store_backend", "qdrant"),
+        "quantization": curr_config.get("quantization", "none"),
+        "embedding_model": curr_config.get("embedding_model", "BAAI/bge-base-en-v1.5"),
+        "reducer": curr_config.get("reducer", "none"),
+        "reduced_dim": curr_config.get("reduced_dim", 256),
+        "qdrant_idle_timeout": curr_config.get("qdrant_idle_timeout", 60),
+        "qdrant_lock_timeout": curr_config.get("qdrant_lock_timeout", 60),
+        "transient_qdrant_threshold": curr_config.get("transient_qdrant_threshold", 1_000_000),
+        "http_retries": curr_config.get("http_retries", 3),
+        "http_compress_requests": curr_config.get("http_compress_requests", False),
     }
     save_config(curr_config)
     return curr_config
 
 
 def save_config(config):
+    # Write a temporary file and swap it in, so concurrent readers never see a half-written config
     config_path = os.path.expanduser("~/.mirageml.json")
-    with open(config_path, "w") as f:
+    tmp_path = f"{config_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(config, f, indent=4)
+    os.replace(tmp_path, config_path)
 
 
 def set_config():
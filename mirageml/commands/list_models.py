@@ -1,10 +1,9 @@
 import sys
 
 import keyring
-import requests
 import typer
 
-from mirageml.constants import SERVICE_ID, SUPABASE_KEY, SUPABASE_URL
+from mirageml.constants import SERVICE_ID, SUPABASE_KEY, SUPABASE_URL, http_client
 
 
 def get_models():
@@ -16,7 +15,7 @@ def get_models():
         "Content-Type": "application/json",
     }
 
-    response = requests.get(
+    response = http_client.get(
         f"{SUPABASE_URL}/rest/v1/user_finetunes?user_id=eq.{user_id}&select=model_name", headers=headers
     )
 
@@ -1,28 +1,59 @@
 import sys
+import time
 
 import typer
 
+# Source names of this process, so questions in a chat session don't list the sources again
+_catalog = {}
 
-def get_sources():
-    from .utils.vectordb import list_local_qdrant_db, list_remote_qdrant_db
 
-    return list_local_qdrant_db(), list_remote_qdrant_db()
+def get_sources(refresh=False):
+    """Return the (local, remote) source names.
+
+    The catalog is kept in ~/.mirageml.json and listed again only when it is older than
+    `source_catalog_ttl` seconds, when `refresh` is set, or when a source is added or deleted.
+    """
+    from .config import load_config
+
+    now = time.time()
+    if not refresh and _catalog and now - _catalog["updated"] < _catalog["ttl"]:
+        return _catalog["local"], _catalog["remote"]
+
+    config = load_config()
+    if not refresh and now - config["sources_updated"] < config["source_catalog_ttl"]:
+        _catalog.update(
+            local=config["local"],
+            remote=config["remote"],
+            updated=config["sources_updated"],
+            ttl=config["source_catalog_ttl"],
+        )
+        return config["local"], config["remote"]
+    return set_sources()
 
 
 def set_sources(local_sources=None, remote_sources=None):
-    from .config import set_var_config
+    """List the sources that aren't given and save them as the catalog."""
+    from .config import load_config, set_var_config
     from .utils.vectordb import list_local_qdrant_db, list_remote_qdrant_db
 
-    if not local_sources:
+    if local_sources is None:
         local_sources = list_local_qdrant_db()
-    if not remote_sources:
+    if remote_sources is None:
         remote_sources = list_remote_qdrant_db()
 
-    set_var_config({"local": local_sources, "remote": remote_sources})
+    updated = time.time()
+    set_var_config({"local": local_sources, "remote": remote_sources, "sources_updated": updated})
+    _catalog.update(
+        local=local_sources,
+        remote=remote_sources,
+        updated=updated,
+        ttl=load_config()["source_catalog_ttl"],
+    )
+    return local_sources, remote_sources
 
 
 def list_sources():
-    local_sources, remote_sources = get_sources()
+    local_sources, remote_sources = get_sources(refresh=True)
 
     if len(local_sources) == 0 and len(remote_sources) == 0:
         typer.secho(
@@ -41,5 +72,3 @@ def list_sources():
             print("------------------")
         typer.secho("Remote Sources:", fg=typer.colors.BRIGHT_GREEN, bold=True)
         print("* " + "\n* ".join(remote_sources))
-
-    set_sources(local_sources, remote_sources)
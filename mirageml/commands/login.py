@@ -2,11 +2,10 @@ import os
 from multiprocessing import Event, Process
 
 import keyring
-import requests
 import segment.analytics as analytics
 import typer
 
-from mirageml.constants import ANALYTICS_WRITE_KEY, SERVICE_ID, USER_CHECK_ENDPOINT, supabase
+from mirageml.constants import ANALYTICS_WRITE_KEY, SERVICE_ID, USER_CHECK_ENDPOINT, http_client, supabase
 
 analytics.write_key = ANALYTICS_WRITE_KEY
 
@@ -51,7 +50,9 @@ def login():
         already_exists = False
         email = typer.prompt("Email")
         if email.strip() != "":
-            already_exists = requests.post(USER_CHECK_ENDPOINT, json={"email": email}).json()["exists"]
+            already_exists = http_client.post(USER_CHECK_ENDPOINT, json={"email": email}, idempotent=True).json()[
+                "exists"
+            ]
 
         if not already_exists:
             print("Looks like you don't have an account yet. Let's create one!")
@@ -9,32 +9,30 @@ from rich.markdown import Markdown
 from rich.panel import Panel
 
 from .config import load_config
+from .list_sources import get_sources
 from .utils.custom_inputs import multiline_input
 from .utils.llm import llm_call
 from .utils.prompt_templates import RAG_TEMPLATE
 from .utils.vectordb import (
-    list_local_qdrant_db,
-    list_remote_qdrant_db,
-    local_qdrant_search,
+    load_hit_texts,
+    local_qdrant_multi_search,
     remote_qdrant_search,
-    transient_qdrant_search,
 )
 
 console = Console()
-config = load_config()
 
 
 def search(user_input, sources, transient_sources=None, live=None):
     from concurrent.futures import ThreadPoolExecutor
 
+    config = load_config()
     hits = []
-    local = list_local_qdrant_db()
-    remote = list_remote_qdrant_db()
+    local, remote = get_sources()
 
     local_sources = [source for source in sources if source in local]
     remote_sources = [source for source in sources if source in remote]
 
-    for source_name in local_sources:
+    if local_sources:
         if live:
             live.update(
                 Panel(
@@ -43,8 +41,8 @@ def search(user_input, sources, transient_sources=None, live=None):
                     border_style="blue",
                 )
             )
-        # Search for matches in each source based on user input
-        hits.extend(local_qdrant_search(source_name, user_input))
+        # Search all local sources at once; hits beyond what rank_hits keeps are dropped early
+        hits.extend(local_qdrant_multi_search(local_sources, user_input, top_k=num_ranked_hits())["hits"])
 
     with ThreadPoolExecutor() as executor:
         futures = [executor.submit(remote_qdrant_search, source_name, user_input) for source_name in remote_sources]
@@ -57,7 +55,7 @@ def search(user_input, sources, transient_sources=None, live=None):
                 )
             )
 
-        for future in futures:
+        for source_name, future in zip(remote_sources, futures):
             try:
                 hits.extend(future.result())
             except Exception:
@@ -77,18 +75,17 @@ def search(user_input, sources, transient_sources=None, live=None):
                     border_style="blue",
                 )
             )
-        # TODO: Optimize this
         if config["local_mode"] or config["keep_files_local"]:
-            for data, metadata in transient_sources:
-                hits.extend(transient_qdrant_search(user_input, data, metadata))
-                if live:
-                    live.update(
-                        Panel(
-                            "Searching through files and urls locally...",
-                            title="[bold blue]Assistant[/bold blue]",
-                            border_style="blue",
-                        )
+            if live:
+                live.update(
+                    Panel(
+                        "Searching through files and urls locally...",
+                        title="[bold blue]Assistant[/bold blue]",
+                        border_style="blue",
                     )
+                )
+            # The session's TransientSources only embed what changed since the previous question
+            hits.extend(transient_sources.search(user_input))
         else:
             source_name = "transient"
             with ThreadPoolExecutor() as executor:
@@ -103,22 +100,34 @@ def search(user_input, sources, transient_sources=None, live=None):
     return hits
 
 
-def rank_hits(hits):
-    # Rank the hits based on their relevance
-    num_hits = 5
+def num_ranked_hits():
+    config = load_config()
     if config["model"] == "claude":
-        num_hits = 40
+        return 40
     elif config["model"] == "gpt-3.5-turbo":
-        num_hits = 20
+        return 20
     elif config["model"] == "gpt-4":
-        num_hits = 10
+        return 10
+    return 5
+
 
-    sorted_hits = sorted(hits, key=lambda x: x["score"], reverse=True)[:num_hits]
+def rank_hits(hits):
+    # Rank the hits based on their relevance
+    sorted_hits = sorted(hits, key=lambda x: x["score"], reverse=True)[: num_ranked_hits()]
     return sorted_hits
 
 
+def _hit_label(payload):
+    # Code chunks carry the line range and symbols they cover
+    if "start_line" not in payload:
+        return str(payload["source"])
+    label = f"{payload['source']}:{payload['start_line']}-{payload['end_line']}"
+    return f"{label} ({payload['symbol']})" if payload.get("symbol") else label
+
+
 def create_context(sorted_hits):
-    return "\n\n".join([str(x["payload"]["source"]) + ": " + x["payload"]["data"] for x in sorted_hits])
+    load_hit_texts(sorted_hits)
+    return "\n\n".join([_hit_label(x["payload"]) + ": " + x["payload"]["data"] for x in sorted_hits])
 
 
 def search_and_rank(user_input, sources, transient_sources, live):
@@ -128,6 +137,7 @@ def search_and_rank(user_input, sources, transient_sources, live):
 
 
 def rag_chat(sources, transient_sources):
+    config = load_config()
     try:
         all_sources = sources + [x[1][0]["source"] for x in transient_sources]
         user_input = multiline_input(f"Ask a question over these sources ({', '.join(all_sources)})")
@@ -150,6 +160,7 @@ def rag_chat(sources, transient_sources):
         auto_refresh=True,
         refresh_per_second=8,
     ) as live:
+        transient_sources.refresh()
         transient_data = ""
         tsources = []
         enc = tiktoken.get_encoding("cl100k_base")
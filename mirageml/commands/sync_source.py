@@ -0,0 +1,67 @@
+import os
+import time
+
+import typer
+
+from .add_source import add_local_source
+from .config import load_config
+from .utils.git_source import list_source_files
+from .utils.vectordb import sync_local_qdrant_db
+
+
+def _snapshot(filepaths):
+    snapshot = {}
+    for filepath in filepaths:
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        snapshot[str(filepath)] = (stat.st_size, stat.st_mtime)
+    return snapshot
+
+
+def sync_source(path=".", interval=1.0, debounce=2.0, workers=None, report_memory=False):
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        typer.secho(f"Unable to read dir: {path}", fg=typer.colors.BRIGHT_RED, bold=True)
+        raise typer.Exit()
+
+    # Read once, load_config rewrites the config file and would race with other processes every tick
+    config = load_config()
+    use_git, ignored_dirs = config["git_enumeration"], config["ignored_dirs"]
+
+    # Snapshot before the initial index so that edits made while it runs are picked up
+    snapshot = _snapshot(list_source_files(path, use_git=use_git, ignored_dirs=ignored_dirs)[0])
+    collection_name = add_local_source(path, workers=workers, report_memory=report_memory)
+    typer.secho(f"Watching {path} for changes. Ctrl+C to stop.", fg=typer.colors.BRIGHT_GREEN, bold=True)
+    last_change = None
+    try:
+        while True:
+            time.sleep(interval)
+            current = _snapshot(list_source_files(path, use_git=use_git, ignored_dirs=ignored_dirs)[0])
+            if current != snapshot:
+                # Wait until the directory has been quiet for `debounce` seconds before syncing
+                snapshot = current
+                last_change = time.monotonic()
+                continue
+
+            if last_change is None or time.monotonic() - last_change < debounce:
+                continue
+
+            try:
+                changes = sync_local_qdrant_db(collection_name, path, workers=workers)
+            except Exception as e:
+                # e.g. a chat holding the local sources, the pending change is retried on the next tick
+                typer.secho(f"[{time.strftime('%H:%M:%S')}] Failed to sync {collection_name}: {e}", fg=typer.colors.RED)
+                continue
+            last_change = None
+            if changes["added"] or changes["modified"] or changes["removed"]:
+                typer.secho(
+                    f"[{time.strftime('%H:%M:%S')}] Synced {collection_name}: "
+                    f"{len(changes['added'])} added, {len(changes['modified'])} modified, "
+                    f"{len(changes['removed'])} removed ({changes['stats']['chunks']} chunks embedded, "
+                    f"{changes['stats']['duplicates']} duplicates skipped)",
+                    fg=typer.colors.GREEN,
+                )
+    except KeyboardInterrupt:
+        typer.secho(f"Stopped syncing {collection_name}", fg=typer.colors.BRIGHT_GREEN, bold=True)
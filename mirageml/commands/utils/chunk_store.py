@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sqlite3
+import uuid
+import zlib
+
+from .common import SQL_BATCH
+from .manifest import get_source_dir
+
+
+class ChunkStore:
+    """Content-addressed store of zlib-compressed chunk text for a local source.
+
+    Points only carry the `text_id` of their chunk, so searches return small
+    payloads and the text is read back for the hits that end up in the prompt.
+    Texts are keyed by sha1 and the store records which text each point uses,
+    so points that share a text share one copy, and a text is deleted once no
+    point uses it.
+
+    It also keeps the dedup hashes of the points, so an incremental sync loads
+    them instead of scrolling the whole collection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text BLOB)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS points (point_id TEXT PRIMARY KEY, text_id TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS points_text_id ON points (text_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes (point_id TEXT PRIMARY KEY, hash TEXT, simhash TEXT, sources TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    @staticmethod
+    def text_id(text):
+        return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def put_many(self, point_ids, texts):
+        """Store the `texts` of `point_ids` and return their ids.
+
+        A point that is stored again, e.g. after an interrupted sync, lets go of its previous text.
+        """
+        ids = [self.text_id(text) for text in texts]
+        keys = [self._point_key(point_id) for point_id in point_ids]
+        replaced = self._text_ids(keys)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO chunks (id, text) VALUES (?, ?)",
+            [(text_id, zlib.compress(text.encode("utf-8", "surrogatepass"))) for text_id, text in zip(ids, texts)],
+        )
+        self._conn.executemany("INSERT OR REPLACE INTO points VALUES (?, ?)", zip(keys, ids))
+        self._delete_unused(replaced.difference(ids))
+        self._conn.commit()
+        return ids
+
+    def get_many(self, ids):
+        """Return a {text_id: text} dict of the stored ids."""
+        ids = list(ids)
+        texts = {}
+        for i in range(0, len(ids), SQL_BATCH):
+            batch = ids[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", batch)
+            texts.update((text_id, zlib.decompress(blob).decode("utf-8", "surrogatepass")) for text_id, blob in rows)
+        return texts
+
+    def release(self, point_ids):
+        """Forget the texts of deleted points, deleting texts that no other point uses."""
+        keys = [self._point_key(point_id) for point_id in point_ids]
+        text_ids = self._text_ids(keys)
+        for i in range(0, len(keys), SQL_BATCH):
+            batch = keys[i : i + SQL_BATCH]
+            self._conn.execute(f"DELETE FROM points WHERE point_id IN ({','.join('?' * len(batch))})", batch)
+        self._delete_unused(text_ids)
+        self._conn.commit()
+
+    def _text_ids(self, keys):
+        text_ids = set()
+        for i in range(0, len(keys), SQL_BATCH):
+            batch = keys[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(f"SELECT text_id FROM points WHERE point_id IN ({placeholders})", batch)
+            text_ids.update(text_id for (text_id,) in rows)
+        return text_ids
+
+    def _delete_unused(self, text_ids):
+        text_ids = list(text_ids)
+        for i in range(0, len(text_ids), SQL_BATCH):
+            batch = text_ids[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(
+                f"DELETE FROM chunks WHERE id IN ({placeholders}) AND id NOT IN (SELECT text_id FROM points)", batch
+            )
+
+    @staticmethod
+    def _point_key(point_id):
+        # Qdrant returns ids in the dashed form of the hex ids the indexer creates
+        return uuid.UUID(str(point_id)).hex
+
+    def has_hashes(self):
+        """Whether the hashes cover every point, which is only known for collections indexed with them."""
+        return self._conn.execute("SELECT 1 FROM meta WHERE name = 'hashes'").fetchone() is not None
+
+    def load_hashes(self):
+        """Yield the (point_id, hash, simhash, sources) of the points."""
+        for point_id, chunk_hash, chunk_simhash, sources in self._conn.execute("SELECT * FROM hashes"):
+            yield point_id, chunk_hash, chunk_simhash, json.loads(sources)
+
+    def put_hashes(self, rows):
+        """Store (point_id, hash, simhash, sources) rows and mark the hashes as complete."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)",
+            [
+                (self._point_key(point_id), chunk_hash, chunk_simhash, json.dumps(sources))
+                for point_id, chunk_hash, chunk_simhash, sources in rows
+            ],
+        )
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('hashes', '1')")
+        self._conn.commit()
+
+    def set_hash_sources(self, sources_by_point):
+        self._conn.executemany(
+            "UPDATE hashes SET sources = ? WHERE point_id = ?",
+            [(json.dumps(sources), self._point_key(point_id)) for point_id, sources in sources_by_point.items()],
+        )
+        self._conn.commit()
+
+    def delete_hashes(self, point_ids):
+        self._conn.executemany("DELETE FROM hashes WHERE point_id = ?", [(self._point_key(x),) for x in point_ids])
+        self._conn.commit()
+
+    def clear_hashes(self):
+        self._conn.execute("DELETE FROM hashes")
+        self._conn.execute("DELETE FROM meta WHERE name = 'hashes'")
+        self._conn.commit()
+
+    def clear(self):
+        self._conn.execute("DELETE FROM chunks")
+        self._conn.execute("DELETE FROM points")
+        self._conn.commit()
+        self.clear_hashes()
+
+    def close(self):
+        self._conn.close()
+
+
+def open_chunk_store(collection_name):
+    return ChunkStore(os.path.join(get_source_dir(collection_name), "chunks.sqlite3"))
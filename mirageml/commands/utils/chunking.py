@@ -0,0 +1,365 @@
+import ast
+import glob
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+PACKAGE_DIR = os.path.dirname(__file__)
+
+# Stand-in for a WordPiece tokenizer when the model's tokenizer is not available: words are split into
+# pieces of at most 4 characters, which slightly overestimates the token count of English text.
+_APPROXIMATE_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+# Preferred places to end a chunk, from strongest to weakest
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def _load_tokenizer(model_id):
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+
+    model_dir = os.path.join(PACKAGE_DIR, "models", model_id)
+    paths = glob.glob(os.path.join(model_dir, "**", "tokenizer.json"), recursive=True)
+    if not paths:
+        # The tokenizer ships with the model, so download it through the registry
+        from .llm import embedding_models
+
+        embedding_models.get(model_id)
+        paths = glob.glob(os.path.join(model_dir, "**", "tokenizer.json"), recursive=True)
+    if not paths:
+        return None
+
+    tokenizer = Tokenizer.from_file(paths[0])
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def get_tokenizer(model_id):
+    """Return the tokenizer of an embedding model, or None to fall back to the approximate tokenizer."""
+    with _tokenizers_lock:
+        if model_id not in _tokenizers:
+            try:
+                _tokenizers[model_id] = _load_tokenizer(model_id)
+            except Exception:
+                _tokenizers[model_id] = None
+        return _tokenizers[model_id]
+
+
+def _check_overlap(max_tokens, overlap_tokens):
+    # Otherwise chunks would advance by a single token
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError(f"overlap_tokens must be at least 0 and below max_tokens ({max_tokens}), got {overlap_tokens}")
+
+
+def chunk_offsets(text, max_tokens=510, overlap_tokens=20, tokenizer=None):
+    """Split `text` into (start, end) character offsets of chunks of at most `max_tokens` tokens.
+
+    Chunks end at the strongest separator (blank line, newline, sentence end, space)
+    found in the second half of the token window, and consecutive chunks overlap
+    by `overlap_tokens` tokens. Without a tokenizer only one window of token spans
+    is held at a time.
+    """
+    _check_overlap(max_tokens, overlap_tokens)
+    if tokenizer is None:
+
+        def window(pos):
+            return [match.span() for match in islice(_APPROXIMATE_TOKEN_RE.finditer(text, pos), max_tokens + 1)]
+
+    else:
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        starts = [start for start, _ in offsets]
+
+        def window(pos):
+            i = bisect_left(starts, pos)
+            return offsets[i : i + max_tokens + 1]
+
+    chunks = []
+    pos = 0
+    while True:
+        tokens = window(pos)
+        if not tokens:
+            break
+        start_char = tokens[0][0]
+        if len(tokens) <= max_tokens:
+            chunks.append((start_char, tokens[-1][1]))
+            break
+
+        # tokens[j] is the first token that is not part of this chunk
+        j = max_tokens
+        end_char = tokens[j - 1][1]
+        for separator in _SEPARATORS:
+            cut = text.rfind(separator, tokens[j // 2][0], tokens[j][0])
+            if cut != -1:
+                end_char = cut + len(separator.rstrip(" "))
+                j = max(bisect_left(tokens, (end_char,)), 1)
+                break
+        chunks.append((start_char, end_char))
+        pos = tokens[max(j - overlap_tokens, 1)][0]
+    return chunks
+
+
+def count_tokens(text, tokenizer=None):
+    if tokenizer is None:
+        return len(_APPROXIMATE_TOKEN_RE.findall(text))
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+# Source files that are chunked along function and class boundaries: Python through `ast`, other languages
+# through a bracket depth and indentation heuristic
+PYTHON_EXTENSIONS = {".py", ".pyi"}
+CODE_EXTENSIONS = PYTHON_EXTENSIONS | {
+    ".c",
+    ".cc",
+    ".cpp",
+    ".cs",
+    ".dart",
+    ".go",
+    ".h",
+    ".hpp",
+    ".java",
+    ".js",
+    ".jsx",
+    ".kt",
+    ".lua",
+    ".m",
+    ".php",
+    ".r",
+    ".rb",
+    ".rs",
+    ".scala",
+    ".sh",
+    ".sol",
+    ".swift",
+    ".ts",
+    ".tsx",
+    ".vue",
+}
+
+_STRING_OR_COMMENT_RE = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`[^`]*`|//.*|(?:^|\s)#.*")
+_CLOSER_RE = re.compile(r"\s*(?:[}\])\]]|end\b|fi\b|done\b|esac\b)")
+# Comments, decorators and annotations belong to the definition that follows them
+_LEADING_RE = re.compile(r"\s*(?://|/\*|\*|#|@|--)")
+_SYMBOL_RE = re.compile(
+    r"\b(?:def|class|function|func|fn|struct|enum|interface|trait|impl|type|module|namespace|object)\s+([A-Za-z_$][\w$.]*)"
+    r"|\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*="
+    r"|([A-Za-z_$][\w$]*)\s*\("
+)
+_PYTHON_COMMENT_RE = re.compile(r"\s*#")
+_NOT_SYMBOLS = {"func", "function", "if", "for", "while", "switch", "catch", "return", "sizeof", "elif", "with"}
+
+
+def is_code_source(source):
+    return os.path.splitext(str(source))[1].lower() in CODE_EXTENSIONS
+
+
+def _leading_start(lines, start, lower, pattern):
+    while start - 1 >= lower and pattern.match(lines[start - 1]):
+        start -= 1
+    return start
+
+
+def _python_units(nodes, first, last, lines, parent=None):
+    """Split lines [first, last) at the statements `nodes` into (first, last, symbol, node) units."""
+    starts = []
+    for i, node in enumerate(nodes):
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])]) - 1
+        if i == 0:
+            start = first
+        else:
+            start = _leading_start(lines, start, max(nodes[i - 1].end_lineno, starts[-1] + 1), _PYTHON_COMMENT_RE)
+        starts.append(start)
+
+    units = []
+    for i, node in enumerate(nodes):
+        symbol = parent
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbol = f"{parent}.{node.name}" if parent else node.name
+        end = starts[i + 1] if i + 1 < len(nodes) else last
+        units.append((starts[i], end, symbol, node))
+    return units
+
+
+def _line_depths(lines):
+    """Bracket depth at the start of every line, ignoring brackets in strings and comments."""
+    depths, depth = [], 0
+    for line in lines:
+        depths.append(depth)
+        code = _STRING_OR_COMMENT_RE.sub("", line)
+        depth += code.count("{") + code.count("(") + code.count("[")
+        depth -= code.count("}") + code.count(")") + code.count("]")
+        depth = max(depth, 0)
+    return depths
+
+
+def _symbol(lines, first, last, depth):
+    for line in lines[first:last]:
+        if not line.strip() or _LEADING_RE.match(line):
+            continue
+        # A bare `name(` only names a signature, not a call: it must open a block (or end a top-level line)
+        signature = line.rstrip().endswith("{") or (depth == 0 and line.rstrip().endswith(")"))
+        for match in _SYMBOL_RE.finditer(line):
+            definition, variable, call = match.groups()
+            name = definition or variable or (call if signature else None)
+            if name and name not in _NOT_SYMBOLS:
+                return name
+        return None
+    return None
+
+
+def _heuristic_units(lines, depths, first, last, depth, parent=None):
+    """Split lines [first, last) at the least indented lines at bracket depth `depth`."""
+    candidates = [
+        i
+        for i in range(first, last)
+        if depths[i] == depth
+        and lines[i].strip()
+        and not _CLOSER_RE.match(lines[i])
+        and not _LEADING_RE.match(lines[i])
+    ]
+    if not candidates:
+        return []
+    indent = min(len(lines[i]) - len(lines[i].lstrip()) for i in candidates)
+    starts = [first]
+    for i in candidates:
+        if len(lines[i]) - len(lines[i].lstrip()) == indent and i > starts[-1]:
+            start = _leading_start(lines, i, starts[-1] + 1, _LEADING_RE)
+            if start > starts[-1]:
+                starts.append(start)
+
+    units = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else last
+        units.append((start, end, _symbol(lines, start, end, depth) or parent, depth))
+    return units
+
+
+def code_chunk_offsets(text, max_tokens=510, overlap_tokens=20, tokenizer=None, python=False, body_start=0):
+    """Split source code into chunks that follow function and class boundaries.
+
+    Top-level definitions are packed into chunks of up to `max_tokens` tokens;
+    definitions that do not fit are split at their members and, failing that,
+    with `chunk_offsets`. The code starts at `body_start` (after a one-line
+    header such as the file path). Returns (start, end, symbol, start_line, end_line)
+    tuples with 1-based line numbers.
+    """
+    _check_overlap(max_tokens, overlap_tokens)
+    body = text[body_start:]
+    lines = body.split("\n")
+    line_starts = [0]
+    position = body.find("\n")
+    while position != -1:
+        line_starts.append(body_start + position + 1)
+        position = body.find("\n", position + 1)
+    line_starts.append(len(text))
+
+    units = None
+    if python:
+        try:
+            tree = ast.parse(body)
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            tree = None
+        if tree is not None and tree.body:
+            units = _python_units(tree.body, 0, len(lines), lines)
+    if units is None:
+        depths = _line_depths(lines)
+        units = _heuristic_units(lines, depths, 0, len(lines), 0)
+
+    def split_units(first, last, symbol, inner):
+        # Python units carry their ast node, heuristic units their bracket depth
+        if isinstance(inner, int):
+            return _heuristic_units(lines, depths, first, last, inner + 1, parent=symbol)
+        body_nodes = getattr(inner, "body", None)
+        if not isinstance(body_nodes, list) or not body_nodes or not isinstance(body_nodes[0], ast.stmt):
+            return []
+        return _python_units(body_nodes, first, last, lines, parent=symbol)
+
+    def fit(units):
+        """Yield (start, end, symbol, tokens) spans of at most `max_tokens` tokens."""
+        for first, last, symbol, inner in units:
+            start, end = line_starts[first], line_starts[last]
+            tokens = count_tokens(text[start:end], tokenizer)
+            if tokens <= max_tokens:
+                yield start, end, symbol, tokens
+                continue
+            parts = split_units(first, last, symbol, inner)
+            if len(parts) > 1:
+                yield from fit(parts)
+                continue
+            for part_start, part_end in chunk_offsets(text[start:end], max_tokens, overlap_tokens, tokenizer):
+                yield start + part_start, start + part_end, symbol, None
+
+    # Pack consecutive spans into chunks; spans from `chunk_offsets` are already full chunks
+    chunks, current, current_tokens = [], None, 0
+    for start, end, symbol, tokens in fit(units):
+        if current is not None and tokens is not None and current_tokens + tokens <= max_tokens:
+            current[1] = end
+            if symbol and symbol not in current[2]:
+                current[2].append(symbol)
+            current_tokens += tokens
+            continue
+        if current is not None:
+            chunks.append(current)
+        current, current_tokens = [start, end, [symbol] if symbol else []], tokens or max_tokens
+    if current is not None:
+        chunks.append(current)
+
+    offsets = []
+    for start, end, symbols in chunks:
+        end = start + len(text[start:end].rstrip())
+        if end > start:
+            start_line, end_line = bisect_right(line_starts, start), bisect_right(line_starts, end - 1)
+            offsets.append((start, end, ", ".join(symbols) or None, start_line, end_line))
+    return offsets
+
+
+if __name__ == "__main__":
+    # Benchmark: import time and throughput of this chunker against langchain's RecursiveCharacterTextSplitter,
+    # which is only compared when langchain is installed (it is no longer a dependency)
+    import importlib.util
+    import subprocess
+    import sys
+    import time
+
+    has_langchain = importlib.util.find_spec("langchain") is not None
+
+    def import_time(statement):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        return time.perf_counter() - start_time
+
+    baseline = import_time("import mirageml.commands")
+    if has_langchain:
+        langchain_import = import_time("import mirageml.commands, langchain.text_splitter") - baseline
+        print(f"import langchain.text_splitter: {langchain_import:.3f}s")
+    else:
+        print("langchain is not installed, skipping the RecursiveCharacterTextSplitter comparison")
+    chunking_import = import_time("import mirageml.commands.utils.chunking, tokenizers") - baseline
+    print(f"import chunking + tokenizers: {chunking_import:.3f}s")
+
+    paragraph = "def function_{i}(argument):\n    return argument * {i}  # some explanation of the code\n\n"
+    text = "".join(paragraph.format(i=i) for i in range(50_000))
+    print(f"Corpus: {len(text) / 1024 / 1024:.1f} MB")
+
+    if has_langchain:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        start_time = time.perf_counter()
+        splitter = RecursiveCharacterTextSplitter(chunk_size=2048, chunk_overlap=80)
+        chunks = [doc.page_content for doc in splitter.create_documents([text])]
+        elapsed = time.perf_counter() - start_time
+        print(f"RecursiveCharacterTextSplitter: {len(chunks)} chunks in {elapsed:.2f}s")
+
+    for name, tokenizer in [("approximate", None), ("model", get_tokenizer("BAAI/bge-base-en-v1.5"))]:
+        if name == "model" and tokenizer is None:
+            continue
+        start_time = time.perf_counter()
+        chunks = chunk_offsets(text, tokenizer=tokenizer)
+        elapsed = time.perf_counter() - start_time
+        print(f"chunk_offsets ({name} tokenizer): {len(chunks)} chunks in {elapsed:.2f}s")
@@ -0,0 +1,23 @@
+import numpy as np
+
+# SQLite limits the number of host parameters per statement
+SQL_BATCH = 500
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items of `iterable`."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def normalize(vectors):
+    """Scale float32 vectors to unit length, leaving zero vectors as they are."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,142 @@
+import hashlib
+import re
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Near-duplicate detection needs enough shingles for the SimHash to be meaningful
+_MIN_NEAR_WORDS = 32
+_SHINGLE_WORDS = 3
+# The 64-bit SimHash is split into max_distance + 1 bands: two hashes within max_distance
+# bits of each other always agree on at least one band, so bands are exact lookup keys
+_MAX_BANDS = 8
+
+
+def _strip_source(text, source):
+    # The first chunk of a local file starts with its path, which would make identical files look different
+    prefix = f"{source}: "
+    return text[len(prefix) :] if text.startswith(prefix) else text
+
+
+def content_hash(text):
+    return hashlib.sha1(_WHITESPACE_RE.sub(" ", text).strip().encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def simhash(words):
+    """64-bit SimHash of the word 3-shingles of `words`."""
+    shingles = [" ".join(words[i : i + _SHINGLE_WORDS]) for i in range(max(len(words) - _SHINGLE_WORDS + 1, 1))]
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8", "surrogatepass"), digest_size=8).digest() for shingle in shingles
+    )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+class ChunkDeduplicator:
+    """Drop exact and near-duplicate chunks before they are embedded.
+
+    Exact duplicates are found by the hash of the whitespace-normalized text and
+    near duplicates by a SimHash within `max_distance` bits. Near duplicates are
+    only looked for in other files, so an edit that grows a chunk of a file is
+    never dropped as a copy of that file's previous chunk. The first copy of a
+    chunk is kept and collects the sources of every copy under `sources`.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = min(max_distance, _MAX_BANDS - 1)
+        self._band_bits = 64 // (self.max_distance + 1) if self.max_distance >= 0 else 64
+        self.exact = 0
+        self.near = 0
+        self._hashes = {}
+        self._band_index = {}
+        self._sources = {}
+        self._changed = set()
+        self._new = {}
+
+    @property
+    def saved(self):
+        return self.exact + self.near
+
+    def _bands(self, value):
+        mask = (1 << self._band_bits) - 1
+        return [(band, (value >> (band * self._band_bits)) & mask) for band in range(self.max_distance + 1)]
+
+    def _register(self, point_id, chunk_hash, chunk_simhash, sources):
+        self._hashes[chunk_hash] = point_id
+        if chunk_simhash is not None:
+            for band in self._bands(chunk_simhash):
+                self._band_index.setdefault(band, []).append((chunk_simhash, point_id))
+        self._sources[point_id] = sources
+
+    def _find_near(self, chunk_simhash, source):
+        for band in self._bands(chunk_simhash):
+            for other, point_id in self._band_index.get(band, ()):
+                if source not in self._sources[point_id] and bin(chunk_simhash ^ other).count("1") <= self.max_distance:
+                    return point_id
+        return None
+
+    def seed(self, store, collection_name, chunk_store=None):
+        """Deduplicate against the points already in `collection_name` of a `VectorStore`.
+
+        The hashes are loaded from `chunk_store` when it has them; otherwise the collection is
+        scrolled once and the hashes are saved to `chunk_store` by `update_sources`.
+        """
+        if chunk_store is not None and chunk_store.has_hashes():
+            for point_id, chunk_hash, chunk_simhash, sources in chunk_store.load_hashes():
+                self._register(point_id, chunk_hash, int(chunk_simhash, 16) if chunk_simhash else None, sources)
+            return
+
+        for point_id, payload in store.scroll(collection_name, fields=["hash", "simhash", "sources", "source"]):
+            if "hash" not in payload:
+                continue
+            chunk_simhash = int(payload["simhash"], 16) if payload.get("simhash") else None
+            self._register(point_id, payload["hash"], chunk_simhash, payload.get("sources", [payload["source"]]))
+            self._new[point_id] = (payload["hash"], payload.get("simhash"))
+
+    def filter(self, chunks, point_id):
+        """Yield the (text, payload) chunks that are not duplicates, adding `hash`, `simhash` and `sources`."""
+        for text, payload in chunks:
+            source = payload["source"]
+            content = _strip_source(text, source)
+            chunk_hash = content_hash(content)
+            words = _WORD_RE.findall(content.lower())
+            chunk_simhash = simhash(words) if len(words) >= _MIN_NEAR_WORDS else None
+
+            kept = self._hashes.get(chunk_hash)
+            if kept is not None:
+                self.exact += 1
+            elif chunk_simhash is not None and self.max_distance >= 0:
+                kept = self._find_near(chunk_simhash, source)
+                if kept is not None:
+                    self.near += 1
+            if kept is not None:
+                if source not in self._sources[kept]:
+                    self._sources[kept].append(source)
+                    self._changed.add(kept)
+                continue
+
+            payload["hash"] = chunk_hash
+            payload["simhash"] = f"{chunk_simhash:016x}" if chunk_simhash is not None else None
+            payload["sources"] = [source]
+            kept_id = point_id(payload)
+            self._register(kept_id, chunk_hash, chunk_simhash, list(payload["sources"]))
+            self._new[kept_id] = (chunk_hash, payload["simhash"])
+            yield text, payload
+
+    def update_sources(self, store, collection_name, chunk_store=None):
+        """Write the sources collected from duplicates back to the kept points, and the new hashes to `chunk_store`."""
+        by_sources = {}
+        for point_id in self._changed:
+            by_sources.setdefault(tuple(self._sources[point_id]), []).append(point_id)
+        for sources, point_ids in by_sources.items():
+            store.set_payload(collection_name, point_ids, {"sources": list(sources)})
+        if chunk_store is not None:
+            chunk_store.set_hash_sources({point_id: self._sources[point_id] for point_id in self._changed})
+            chunk_store.put_hashes(
+                (point_id, chunk_hash, chunk_simhash, self._sources[point_id])
+                for point_id, (chunk_hash, chunk_simhash) in self._new.items()
+            )
+        self._changed.clear()
+        self._new.clear()
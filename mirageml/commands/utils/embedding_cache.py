@@ -0,0 +1,155 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from .common import SQL_BATCH
+
+PACKAGE_DIR = os.path.dirname(__file__)
+EMBEDDING_CACHE_PATH = os.path.join(PACKAGE_DIR, "embedding_cache.sqlite3")
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk cache of float32 embeddings.
+
+    Vectors are stored as raw float32 blobs in SQLite, keyed by
+    sha256(model id, max_length, text). When the cache grows past `max_bytes`
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, model TEXT, vector BLOB, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model_id, max_length, text):
+        digest = hashlib.sha256()
+        digest.update(f"{model_id}\0{max_length}\0".encode("utf-8"))
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+
+    def get_many(self, model_id, max_length, texts):
+        """Return a list aligned with `texts` holding cached vectors or None."""
+        keys = [self.key(model_id, max_length, text) for text in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), SQL_BATCH):
+                batch = keys[i : i + SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            now = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+            self._increment("hits", sum(1 for k in keys if k in found))
+            self._increment("misses", sum(1 for k in keys if k not in found))
+            self._conn.commit()
+
+        return [np.frombuffer(found[k], dtype=np.float32) if k in found else None for k in keys]
+
+    def put_many(self, model_id, max_length, texts, vectors):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((self.key(model_id, max_length, text), model_id, blob, len(blob), now))
+
+        with self._lock:
+            for row in rows:
+                previous = self._conn.execute("SELECT size FROM embeddings WHERE key = ?", (row[0],)).fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", row)
+                self._total_bytes += row[3] - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Evict down to 90% so that a full cache does not evict on every write
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC")
+        evicted = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._increment("evictions", len(evicted))
+
+    def _increment(self, name, amount):
+        if amount:
+            self._conn.execute(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            models = self._conn.execute("SELECT model, COUNT(*), SUM(size) FROM embeddings GROUP BY model").fetchall()
+        return {
+            "path": self.path,
+            "entries": sum(count for _, count, _ in models),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "models": {model: {"entries": count, "bytes": size} for model, count, size in models},
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.execute("DELETE FROM counters")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._total_bytes = 0
+
+
+_embedding_cache = None
+_embedding_cache_loaded = False
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Return the process-wide embedding cache, or None if disabled in the config."""
+    global _embedding_cache, _embedding_cache_loaded
+
+    from ..config import load_config
+
+    with _embedding_cache_lock:
+        if not _embedding_cache_loaded:
+            config = load_config()
+            if config["embedding_cache"]:
+                _embedding_cache = EmbeddingCache(max_bytes=int(config["embedding_cache_max_mb"]) * 1024 * 1024)
+            _embedding_cache_loaded = True
+        return _embedding_cache
+
+
+def configure_embedding_cache(enabled, max_mb):
+    """Set up the process-wide embedding cache from the given settings instead of the config."""
+    global _embedding_cache, _embedding_cache_loaded
+
+    with _embedding_cache_lock:
+        if _embedding_cache is None and enabled:
+            _embedding_cache = EmbeddingCache(max_bytes=int(max_mb) * 1024 * 1024)
+        _embedding_cache_loaded = True
@@ -0,0 +1,159 @@
+import hashlib
+import itertools
+import os
+import subprocess
+
+from .local_source import (
+    _ignored_dirs,
+    _inherited_specs,
+    _load_spec,
+    get_unignored_files,
+    is_ignored,
+    is_ignored_filename,
+)
+
+MIRAGEIGNORE = ".mirageignore"
+
+# Symlinks and submodules have no file content of their own to index
+_SKIPPED_MODES = ("120000", "160000")
+
+
+def _git(commands, cwd):
+    """Run several git commands concurrently and return their outputs."""
+    processes = [
+        subprocess.Popen(["git", *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for args in commands
+    ]
+    outputs = [process.communicate()[0] for process in processes]
+    if any(process.returncode != 0 for process in processes):
+        raise subprocess.CalledProcessError(processes[0].returncode, "git")
+    return outputs
+
+
+def git_blob_hash(filepath):
+    """Hash a file the way `git hash-object` does, so it can be compared with blob ids from the index."""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        digest.update(b"blob %d\0" % os.fstat(f.fileno()).st_size)
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _GitPathFilter:
+    """Apply the rules of the directory walk that git doesn't know about to the paths git lists.
+
+    Git already applied .gitignore and .git/info/exclude, which leaves .mirageignore
+    files, hidden entries and `ignored_dirs`. Like the walk, a path is dropped when
+    one of its directories is.
+    """
+
+    def __init__(self, start_dir, mirageignore_dirs, ignored_dirs):
+        self.start_dir = start_dir
+        self.mirageignore_dirs = mirageignore_dirs
+        self.ignored_dirs = ignored_dirs
+        self._directories = {}
+
+    def _directory(self, directory):
+        # (ignored, specs) of a directory relative to start_dir, built from its parent's
+        state = self._directories.get(directory)
+        if state is not None:
+            return state
+        if directory:
+            path = os.path.join(self.start_dir, directory)
+            parent, _, name = directory.rpartition("/")
+            ignored, specs = self._directory(parent)
+            ignored = (
+                ignored
+                or name.startswith(".")
+                or is_ignored(path, specs, is_dir=True, default=name in self.ignored_dirs)
+            )
+        else:
+            path = self.start_dir
+            ignored, specs = False, _inherited_specs(self.start_dir, filenames=(MIRAGEIGNORE,))
+        if not ignored and directory in self.mirageignore_dirs:
+            spec = _load_spec(os.path.join(path, MIRAGEIGNORE))
+            if spec:
+                specs = specs + [(path, spec)]
+        state = self._directories[directory] = (ignored, specs)
+        return state
+
+    def is_indexed(self, path):
+        directory, _, filename = path.rpartition("/")
+        ignored, specs = self._directory(directory)
+        if ignored or is_ignored_filename(filename):
+            return False
+        return not is_ignored(os.path.join(self.start_dir, path), specs)
+
+
+def list_git_files(start_dir, ignored_dirs=None):
+    """List the files of a git work tree from its index.
+
+    Returns (filepaths, known_hashes) where `known_hashes` maps the tracked files
+    that are clean in the work tree to their blob ids. Untracked, non-ignored
+    files are included without a hash, and .mirageignore files apply on top of
+    git's own ignore rules. Returns None if `start_dir` is not inside a git work
+    tree or git is unavailable.
+    """
+    start_dir = os.path.abspath(start_dir)
+    try:
+        staged, dirty, untracked = _git(
+            [
+                ["ls-files", "--stage", "-z"],
+                ["diff-files", "--name-only", "--relative", "-z"],
+                ["ls-files", "--others", "--exclude-standard", "-z"],
+            ],
+            start_dir,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    dirty = set(os.fsdecode(dirty).split("\0"))
+    staged = [record.split("\t", 1) for record in os.fsdecode(staged).split("\0") if record]
+    untracked = [path for path in os.fsdecode(untracked).split("\0") if path]
+    mirageignore_dirs = {
+        path.rpartition("/")[0]
+        for path in itertools.chain((path for _, path in staged), untracked)
+        if path.rpartition("/")[2] == MIRAGEIGNORE
+    }
+    is_indexed = _GitPathFilter(start_dir, mirageignore_dirs, _ignored_dirs(ignored_dirs)).is_indexed
+
+    known_hashes = {}
+    filepaths = {}
+    for info, path in staged:
+        mode, blob_id, stage = info.split(" ")
+        if mode in _SKIPPED_MODES or not is_indexed(path):
+            continue
+        filepath = os.path.join(start_dir, path)
+        filepaths[filepath] = None
+        # Unmerged paths have several stages; treat them like dirty files and hash the work tree copy
+        if path not in dirty and stage == "0":
+            known_hashes[filepath] = blob_id
+        else:
+            known_hashes.pop(filepath, None)
+
+    for path in untracked:
+        if is_indexed(path):
+            filepaths[os.path.join(start_dir, path)] = None
+
+    return list(filepaths), known_hashes
+
+
+def list_source_files(start_dir, use_git=None, ignored_dirs=None):
+    """List the files of a local source.
+
+    Inside a git work tree (and with `use_git`, by default the `git_enumeration`
+    config key) the files and their blob ids come from the git index; otherwise
+    the directory is walked. Returns (filepaths, known_hashes), with
+    `known_hashes` None for a walk.
+    """
+    if use_git is None:
+        from ..config import load_config
+
+        use_git = load_config()["git_enumeration"]
+
+    if use_git:
+        git_files = list_git_files(start_dir, ignored_dirs=ignored_dirs)
+        if git_files is not None:
+            return git_files
+    return get_unignored_files(start_dir, ignored_dirs=ignored_dirs), None
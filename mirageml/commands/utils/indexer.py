@@ -0,0 +1,245 @@
+import itertools
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from rich.panel import Panel
+
+from .common import batched
+from .dedup import ChunkDeduplicator
+from .llm import DEFAULT_EMBEDDING_MODEL, _chunk_data, local_get_embedding
+
+
+def _update_live(live, message):
+    if live:
+        live.update(
+            Panel(
+                message,
+                title="[bold green]Indexer[/bold green]",
+                border_style="green",
+            ),
+            refresh=True,
+        )
+
+
+def point_id(source, chunk, content_hash=None):
+    """Deterministic point id so that re-indexing a chunk overwrites its previous point.
+
+    Deduplicated points can outlive their first source, so their id also covers the content.
+    """
+    name = f"{source}#{chunk}" if content_hash is None else f"{source}#{chunk}#{content_hash}"
+    return uuid.uuid5(uuid.NAMESPACE_URL, name).hex
+
+
+def _payload_point_id(payload):
+    return point_id(payload["source"], payload["chunk"], payload.get("hash"))
+
+
+def iter_chunks(
+    documents,
+    max_tokens=None,
+    overlap_tokens=None,
+    code_chunking=None,
+    embedding_model_id=DEFAULT_EMBEDDING_MODEL,
+    live=None,
+):
+    """Chunk a stream of (data, metadata) documents into a stream of (text, payload) chunks.
+
+    Chunk sizes are counted in tokens of the tokenizer of `embedding_model_id`.
+    """
+    if None in (max_tokens, overlap_tokens, code_chunking):
+        from ..config import load_config
+
+        config = load_config()
+        max_tokens = config["chunk_max_tokens"] if max_tokens is None else max_tokens
+        overlap_tokens = config["chunk_overlap_tokens"] if overlap_tokens is None else overlap_tokens
+        code_chunking = config["code_chunking"] if code_chunking is None else code_chunking
+
+    for dat, meta in documents:
+        _update_live(live, f"Chunking: {meta['source']}")
+        doc_chunks, doc_metadata = _chunk_data(
+            dat, meta, max_tokens, overlap_tokens, code_chunking, embedding_model_id=embedding_model_id
+        )
+        yield from zip(doc_chunks, doc_metadata)
+
+
+def _init_embedding_worker(threads, cache_enabled, cache_max_mb, idle_timeout):
+    # Pin the intra-op threads of this worker so that N workers share the cores instead of oversubscribing them
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["NUMEXPR_MAX_THREADS"] = str(threads)
+
+    from .embedding_cache import configure_embedding_cache
+    from .llm import embedding_models
+
+    # The settings come from the parent, so workers never read (and rewrite) ~/.mirageml.json
+    configure_embedding_cache(cache_enabled, cache_max_mb)
+    embedding_models.idle_timeout = idle_timeout
+    embedding_models.threads = threads
+
+
+def _embed_batch(chunks, batch_size, embedding_model_id):
+    return local_get_embedding(chunks, embedding_model_id, batch_size=batch_size, as_numpy=True)
+
+
+def iter_embedding_batches(chunks, batch_size, workers=1, embedding_model_id=DEFAULT_EMBEDDING_MODEL, live=None):
+    """Embed a stream of (text, payload) chunks in fixed-size batches, yielding (payloads, vectors) in order.
+
+    With `workers` > 1 the batches are sharded across a process pool where every
+    worker loads its own model. At most 2 * `workers` batches are in flight, so a
+    slow consumer holds back chunking instead of letting batches pile up.
+    """
+    batches = batched(chunks, batch_size)
+    first, second = next(batches, None), next(batches, None)
+    batches = (batch for batch in itertools.chain([first, second], batches) if batch is not None)
+
+    done = 0
+    if workers <= 1 or second is None:
+        for batch in batches:
+            vectors = local_get_embedding(
+                [text for text, _ in batch], embedding_model_id, batch_size=batch_size, as_numpy=True
+            )
+            done += len(batch)
+            _update_live(live, f"Embedding: {done} chunks")
+            yield [payload for _, payload in batch], vectors
+        return
+
+    from ..config import load_config
+
+    config = load_config()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_embedding_worker,
+        initargs=(
+            threads,
+            config["embedding_cache"],
+            config["embedding_cache_max_mb"],
+            config["embedding_idle_timeout"],
+        ),
+    ) as executor:
+        pending = deque()
+        for batch in batches:
+            future = executor.submit(_embed_batch, [text for text, _ in batch], batch_size, embedding_model_id)
+            pending.append(([payload for _, payload in batch], future))
+            if len(pending) < 2 * workers:
+                continue
+            payloads, future = pending.popleft()
+            done += len(payloads)
+            _update_live(live, f"Embedding: {done} chunks ({workers} workers)")
+            yield payloads, future.result()
+        while pending:
+            payloads, future = pending.popleft()
+            done += len(payloads)
+            _update_live(live, f"Embedding: {done} chunks ({workers} workers)")
+            yield payloads, future.result()
+
+
+def peak_rss_bytes(children=False):
+    """Peak resident set size of this process, or None where `resource` is unavailable.
+
+    With `children` it is the peak of the largest finished child process instead,
+    e.g. an embedding worker once its pool has shut down.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def index_documents(
+    store,
+    collection_name,
+    documents,
+    batch_size=None,
+    workers=None,
+    upsert_batch_size=None,
+    upload_parallel=None,
+    dedup=None,
+    dedup_max_distance=None,
+    existing=False,
+    chunk_store=None,
+    embedding_model_id=DEFAULT_EMBEDDING_MODEL,
+    reducer=None,
+    live=None,
+):
+    """Stream documents through chunk -> dedup -> embed -> upsert into `collection_name` of a `VectorStore`.
+
+    `documents` is an iterable of (data, metadata) pairs that is consumed lazily,
+    so peak memory is bounded by the batch sizes rather than by the corpus size.
+    Duplicates of chunks seen in this run, or already in the collection when
+    `existing` is set, are not embedded again. Chunks are embedded with
+    `embedding_model_id`, which must be the model of the collection, and
+    projected by `reducer` when the collection has one (fitting it first if
+    needed). With a `chunk_store` the chunk text is kept there and payloads
+    only carry its `text_id`. Returns a stats dict with the indexing
+    throughput, saved embeddings and peak RSS.
+    """
+    if None in (batch_size, workers, upsert_batch_size, upload_parallel, dedup, dedup_max_distance):
+        from ..config import load_config
+
+        config = load_config()
+        batch_size = config["embedding_batch_size"] if batch_size is None else batch_size
+        workers = config["embedding_workers"] if workers is None else workers
+        upsert_batch_size = config["upsert_batch_size"] if upsert_batch_size is None else upsert_batch_size
+        upload_parallel = config["upload_parallel"] if upload_parallel is None else upload_parallel
+        dedup = config["dedup"] if dedup is None else dedup
+        dedup_max_distance = config["dedup_max_distance"] if dedup_max_distance is None else dedup_max_distance
+
+    num_chunks = 0
+    deduplicator = None
+    if dedup:
+        deduplicator = ChunkDeduplicator(max_distance=dedup_max_distance)
+        if existing:
+            deduplicator.seed(store, collection_name, chunk_store=chunk_store)
+    elif chunk_store is not None:
+        # Points indexed without dedup have no hashes, so the stored ones no longer cover the collection
+        chunk_store.clear_hashes()
+
+    def iter_points():
+        nonlocal num_chunks
+        chunks = iter_chunks(documents, embedding_model_id=embedding_model_id, live=live)
+        if deduplicator is not None:
+            chunks = deduplicator.filter(chunks, _payload_point_id)
+        batches = iter_embedding_batches(
+            chunks, batch_size, workers=workers, embedding_model_id=embedding_model_id, live=live
+        )
+        if reducer is not None:
+            batches = reducer.reduce_batches(batches)
+        for payloads, vectors in batches:
+            num_chunks += len(payloads)
+            if chunk_store is not None:
+                text_ids = chunk_store.put_many(
+                    [_payload_point_id(payload) for payload in payloads], [payload.pop("data") for payload in payloads]
+                )
+                for payload, text_id in zip(payloads, text_ids):
+                    payload["text_id"] = text_id
+            for payload, vector in zip(payloads, vectors):
+                yield _payload_point_id(payload), vector, payload
+
+    start_time = time.perf_counter()
+    store.upsert(collection_name, iter_points(), batch_size=upsert_batch_size, parallel=upload_parallel)
+    if deduplicator is not None:
+        deduplicator.update_sources(store, collection_name, chunk_store=chunk_store)
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "chunks": num_chunks,
+        "batch_size": batch_size,
+        "workers": workers,
+        "seconds": elapsed,
+        "chunks_per_second": num_chunks / elapsed if elapsed > 0 else 0.0,
+        "duplicates": deduplicator.saved if deduplicator is not None else 0,
+        "exact_duplicates": deduplicator.exact if deduplicator is not None else 0,
+        "near_duplicates": deduplicator.near if deduplicator is not None else 0,
+        "peak_rss": peak_rss_bytes(),
+        # The pool has shut down by now, so its workers count as finished children
+        "peak_worker_rss": peak_rss_bytes(children=True) if workers > 1 else None,
+    }
@@ -1,57 +1,223 @@
 import os
 import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
 from io import StringIO
 
 import keyring
-import requests
+import numpy as np
 
 from ...constants import (
     LLM_GPT_ENDPOINT,
     SERVICE_ID,
     get_headers,
+    http_client,
 )
 from ..config import load_config
 
 PACKAGE_DIR = os.path.dirname(__file__)
 os.environ["TRANSFORMERS_CACHE"] = os.path.join(PACKAGE_DIR, "models")
-os.environ["NUMEXPR_MAX_THREADS"] = "8"
+os.environ.setdefault("NUMEXPR_MAX_THREADS", "8")
 
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+# Output dimension of the embedding models, so collections can be created without loading the model
+EMBEDDING_DIMENSIONS = {
+    "BAAI/bge-base-en-v1.5": 768,
+    "BAAI/bge-small-en-v1.5": 384,
+    "BAAI/bge-large-en-v1.5": 1024,
+}
 
-def _chunk_data(data, metadata):
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=2048, chunk_overlap=80)
-    docs = text_splitter.create_documents([data])
-    chunks = [x.page_content for x in docs]
-    meta = [{"data": curr_chunk, "source": metadata["source"]} for curr_chunk in chunks]
-    vector_data = local_get_embedding(chunks)
+def _chunk_data(
+    data,
+    metadata,
+    max_tokens=None,
+    overlap_tokens=None,
+    code_chunking=None,
+    embedding_model_id=DEFAULT_EMBEDDING_MODEL,
+):
+    from .chunking import (
+        PYTHON_EXTENSIONS,
+        chunk_offsets,
+        code_chunk_offsets,
+        get_tokenizer,
+        is_code_source,
+    )
 
-    return chunks, meta, vector_data
+    if None in (max_tokens, overlap_tokens, code_chunking):
+        config = load_config()
+        max_tokens = config["chunk_max_tokens"] if max_tokens is None else max_tokens
+        overlap_tokens = config["chunk_overlap_tokens"] if overlap_tokens is None else overlap_tokens
+        code_chunking = config["code_chunking"] if code_chunking is None else code_chunking
 
+    source = metadata["source"]
+    tokenizer = get_tokenizer(embedding_model_id)
+    if code_chunking and is_code_source(source):
+        # Local files are prefixed with their path, which stays on the first line of the first chunk
+        prefix = str(source) + ": "
+        code_chunks = code_chunk_offsets(
+            data,
+            max_tokens,
+            overlap_tokens,
+            tokenizer=tokenizer,
+            python=os.path.splitext(str(source))[1].lower() in PYTHON_EXTENSIONS,
+            body_start=len(prefix) if data.startswith(prefix) else 0,
+        )
+        chunks = [data[start:end] for start, end, _, _, _ in code_chunks]
+        meta = [
+            {
+                "data": curr_chunk,
+                "source": source,
+                "chunk": i,
+                "start": start,
+                "end": end,
+                "symbol": symbol,
+                "start_line": start_line,
+                "end_line": end_line,
+            }
+            for i, (curr_chunk, (start, end, symbol, start_line, end_line)) in enumerate(zip(chunks, code_chunks))
+        ]
+        return chunks, meta
 
-def local_get_embedding(text_list, embedding_model_id="BAAI/bge-base-en-v1.5"):
-    model_dir = os.path.join(PACKAGE_DIR, "models", embedding_model_id)
-    if not os.path.exists(model_dir):
-        os.makedirs(model_dir, exist_ok=True)
-        print("Downloading model to:", model_dir)
-        print("This will take a few minutes and only happen once!")
+    offsets = chunk_offsets(data, max_tokens, overlap_tokens, tokenizer=tokenizer)
+    chunks = [data[start:end] for start, end in offsets]
+    meta = [
+        {"data": curr_chunk, "source": source, "chunk": i, "start": start, "end": end}
+        for i, (curr_chunk, (start, end)) in enumerate(zip(chunks, offsets))
+    ]
 
-    # TODO: Suppress stdout/stderr
-    original_stdout, original_stderr = sys.stdout, sys.stderr
-    sys.stdout, sys.stderr = StringIO(), StringIO()
+    return chunks, meta
 
-    # # Restore stdout/stderr
-    from fastembed.embedding import FlagEmbedding as Embedding
 
-    embedding_model = Embedding(model_name=embedding_model_id, max_length=512, cache_dir=model_dir)
-    embeddings = list(embedding_model.embed(text_list))
-    sys.stdout, sys.stderr = original_stdout, original_stderr
+class EmbeddingModelRegistry:
+    """Process-wide cache of loaded fastembed models keyed by (model id, max_length).
+
+    Models are loaded once, shared between threads and freed after they have been
+    idle for `idle_timeout` seconds (the `embedding_idle_timeout` config key).
+    `threads` pins the number of ONNX intra-op threads of newly loaded models.
+    """
+
+    def __init__(self, idle_timeout=None, threads=None):
+        self._idle_timeout = idle_timeout
+        self.threads = threads
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    @property
+    def idle_timeout(self):
+        if self._idle_timeout is None:
+            self._idle_timeout = float(load_config()["embedding_idle_timeout"])
+        return self._idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, value):
+        self._idle_timeout = float(value)
+
+    def get(self, model_id, max_length=512):
+        key = (model_id, max_length)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                entry = self._models[key] = {"model": self._load(model_id, max_length), "last_used": 0.0}
+            else:
+                self._stats[key]["reuses"] += 1
+            entry["last_used"] = time.monotonic()
+            self._schedule_reaper()
+            return entry["model"]
+
+    def _load(self, model_id, max_length):
+        model_dir = os.path.join(PACKAGE_DIR, "models", model_id)
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir, exist_ok=True)
+            print("Downloading model to:", model_dir)
+            print("This will take a few minutes and only happen once!")
+
+        start = time.perf_counter()
+        # Suppress the download/progress output of fastembed
+        with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+            from fastembed.embedding import FlagEmbedding as Embedding
+
+            model = Embedding(model_name=model_id, max_length=max_length, cache_dir=model_dir, threads=self.threads)
+
+        stats = self._stats.setdefault((model_id, max_length), {"loads": 0, "load_time": 0.0, "reuses": 0})
+        stats["loads"] += 1
+        stats["load_time"] += time.perf_counter() - start
+        return model
+
+    def _schedule_reaper(self, delay=None):
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        self._reaper = threading.Timer(self.idle_timeout if delay is None else delay, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        with self._lock:
+            self._reaper = None
+            now = time.monotonic()
+            for key in [k for k, v in self._models.items() if now - v["last_used"] >= self.idle_timeout]:
+                del self._models[key]
+            if self._models:
+                oldest = min(v["last_used"] for v in self._models.values())
+                self._schedule_reaper(max(oldest + self.idle_timeout - now, 0.1))
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                f"{model_id}:{max_length}": dict(stats, loaded=(model_id, max_length) in self._models)
+                for (model_id, max_length), stats in self._stats.items()
+            }
+
+
+embedding_models = EmbeddingModelRegistry()
+
+
+def local_get_embedding(
+    text_list, embedding_model_id=DEFAULT_EMBEDDING_MODEL, max_length=512, batch_size=256, as_numpy=False
+):
+    from .embedding_cache import get_embedding_cache
+
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(embedding_model_id, max_length, text_list) if cache else [None] * len(text_list)
+
+    missing = [i for i, x in enumerate(embeddings) if x is None]
+    if missing:
+        embedding_model = embedding_models.get(embedding_model_id, max_length=max_length)
+        missing_text = [text_list[i] for i in missing]
+        computed = list(embedding_model.embed(missing_text, batch_size=batch_size))
+        if cache:
+            cache.put_many(embedding_model_id, max_length, missing_text, computed)
+        for i, vector in zip(missing, computed):
+            embeddings[i] = vector
+
+    if as_numpy:
+        return np.stack(embeddings).astype(np.float32, copy=False)
 
     # Convert the embeddings to a list
-    embeddings = [x.tolist() for x in embeddings]  # size = 768
+    embeddings = [x.tolist() for x in embeddings]
     return embeddings
 
 
+def embedding_dimension(embedding_model_id=DEFAULT_EMBEDDING_MODEL):
+    """Size of the vectors of an embedding model, from the table above or the models fastembed knows about."""
+    if embedding_model_id not in EMBEDDING_DIMENSIONS:
+        with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+            from fastembed.embedding import FlagEmbedding as Embedding
+
+            supported = {model["model"]: model["dim"] for model in Embedding.list_supported_models()}
+        if embedding_model_id not in supported:
+            raise ValueError(f"Unsupported embedding model: {embedding_model_id}")
+        EMBEDDING_DIMENSIONS[embedding_model_id] = supported[embedding_model_id]
+    return EMBEDDING_DIMENSIONS[embedding_model_id]
+
+
 def local_llm_call(messages, llm_model_id="TheBloke/Llama-2-7b-Chat-GGUF", stream=False, live=None):
     from ctransformers import AutoModelForCausalLM
     from rich.box import HORIZONTALS
@@ -95,10 +261,6 @@ def local_llm_call(messages, llm_model_id="TheBloke/Llama-2-7b-Chat-GGUF", strea
         return llm(formatted_messages)
 
 
-def get_embedding(text_list, model="BAAI/bge-small-en-v1.5"):
-    raise NotImplementedError
-
-
 def llm_call(messages, model="gpt-3.5-turbo", stream=False, local=False, live=None):
     if local:
         return local_llm_call(messages, stream=stream, live=live)
@@ -108,4 +270,4 @@ def llm_call(messages, model="gpt-3.5-turbo", stream=False, local=False, live=No
     json_data = {"user_id": user_id, "model": model, "messages": messages, "stream": stream}
     if openai_key:
         json_data["openai_key"] = openai_key
-    return requests.post(LLM_GPT_ENDPOINT, json=json_data, headers=get_headers(), stream=stream)
+    return http_client.post(LLM_GPT_ENDPOINT, json=json_data, headers=get_headers(), stream=stream, compress=True)
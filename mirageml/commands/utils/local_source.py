@@ -1,11 +1,72 @@
+import codecs
+import itertools
+import mmap
 import os
+import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
 
+import chardet
 import typer
 from pathspec import PathSpec
 from pathspec.patterns import GitWildMatchPattern
 
+# Directories that are rarely worth indexing: dependencies, virtualenvs and build output. This is the default
+# of the `ignored_dirs` config key, and a `!name/` line in an ignore file re-includes one of them.
+DEFAULT_IGNORED_DIRS = frozenset(
+    {
+        "node_modules",
+        "bower_components",
+        "vendor",
+        "venv",
+        "env",
+        "site-packages",
+        "__pycache__",
+        "build",
+        "dist",
+        "target",
+        "out",
+        "coverage",
+        "htmlcov",
+    }
+)
+DEFAULT_IGNORED_EXTENSIONS = frozenset(
+    {
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".ico",
+        ".webp",
+        ".pdf",
+        ".zip",
+        ".gz",
+        ".tar",
+        ".jar",
+        ".whl",
+        ".so",
+        ".dylib",
+        ".dll",
+        ".exe",
+        ".bin",
+        ".pyc",
+        ".o",
+        ".a",
+        ".class",
+        ".woff",
+        ".woff2",
+        ".ttf",
+        ".mp3",
+        ".mp4",
+        ".mov",
+        ".onnx",
+        ".pt",
+        ".npy",
+        ".sqlite3",
+    }
+)
+IGNORE_FILENAMES = (".gitignore", ".mirageignore")
+
 
 def load_gitignore_patterns(gitignore_path):
     with open(gitignore_path, "r") as f:
@@ -14,38 +75,298 @@ def load_gitignore_patterns(gitignore_path):
     return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
 
 
-def is_ignored(path, spec):
-    return spec.match_file(path)
+def _load_spec(ignore_path):
+    try:
+        patterns = load_gitignore_patterns(ignore_path)
+    except (OSError, UnicodeDecodeError):
+        return None
+    return PathSpec.from_lines(GitWildMatchPattern, patterns) if patterns else None
+
+
+def _find_git_root(path):
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _inherited_specs(start_dir, filenames=IGNORE_FILENAMES):
+    """Ignore specs that apply to `start_dir` from its enclosing git work tree, from the shallowest to the deepest."""
+    git_root = _find_git_root(start_dir)
+    if git_root is None:
+        return []
+
+    specs = []
+    exclude_spec = _load_spec(os.path.join(git_root, ".git", "info", "exclude")) if ".gitignore" in filenames else None
+    if exclude_spec:
+        specs.append((git_root, exclude_spec))
+
+    # Ignore files of the directories between the work tree root and start_dir (start_dir's own are read by the walk)
+    directory = git_root
+    for part in os.path.relpath(start_dir, git_root).split(os.sep):
+        if part in ("", "."):
+            break
+        for name in filenames:
+            spec = _load_spec(os.path.join(directory, name))
+            if spec:
+                specs.append((directory, spec))
+        directory = os.path.join(directory, part)
+    return specs
+
+
+def is_ignored_filename(filename):
+    if filename.startswith("."):
+        return True
+    dot = filename.rfind(".")
+    return dot > 0 and filename[dot:].lower() in DEFAULT_IGNORED_EXTENSIONS
+
+
+def _spec_match(spec, relative_path):
+    """Return whether the last pattern of `spec` matching `relative_path` ignores it, or None if none matches."""
+    ignored = None
+    for pattern in spec.patterns:
+        if pattern.include is not None and pattern.match_file(relative_path) is not None:
+            ignored = pattern.include
+    return ignored
+
+
+def is_ignored(path, specs, is_dir=False, default=False):
+    """Check `path` against (base directory, spec) pairs, matching it relative to each spec's directory.
 
+    Like git, the specs are ordered from the shallowest to the deepest ignore file and the last
+    matching pattern wins, so a nested `!keep.log` re-includes what a parent `*.log` ignores.
+    `default` is the result when no pattern matches.
+    """
+    ignored = default
+    for base, spec in specs:
+        relative_path = path[len(base) + 1 :]
+        if is_dir:
+            relative_path += "/"
+        match = _spec_match(spec, relative_path)
+        if match is not None:
+            ignored = match
+    return ignored
 
-def get_unignored_files(start_dir):
-    gitignore_path = Path(start_dir) / ".gitignore"
-    if not gitignore_path.exists():
-        return [f for f in Path(start_dir).rglob("*") if f.is_file()]
 
-    patterns = load_gitignore_patterns(gitignore_path)
-    spec = PathSpec.from_lines(GitWildMatchPattern, patterns)
+def _ignored_dirs(ignored_dirs):
+    if ignored_dirs is None:
+        from ..config import load_config
+
+        ignored_dirs = load_config()["ignored_dirs"]
+    return frozenset(ignored_dirs)
+
+
+def get_unignored_files(start_dir, ignored_dirs=None):
+    """List the files under `start_dir` that are worth indexing.
+
+    Honours nested .gitignore and .mirageignore files, .git/info/exclude and the
+    ignore files of parent directories inside the same git work tree. Hidden
+    entries are pruned before they are descended into, and so are `ignored_dirs`
+    (the `ignored_dirs` config key) unless an ignore file re-includes them.
+    """
+    start_dir = os.path.abspath(start_dir)
+    ignored_dirs = _ignored_dirs(ignored_dirs)
 
     unignored_files = []
-    for root, dirs, files in os.walk(start_dir):
-        # Remove dirs that are ignored to avoid traversing them
-        dirs[:] = [d for d in dirs if not is_ignored(os.path.join(root, d), spec)]
+    stack = [(start_dir, _inherited_specs(start_dir))]
+    while stack:
+        directory, specs = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
 
-        for file in files:
-            filepath = os.path.join(root, file)
-            if not is_ignored(filepath, spec) and not filepath.split("/")[1].startswith(".") and ".git" not in filepath:
-                unignored_files.append(filepath)
+        names = {entry.name for entry in entries}
+        local_specs = [_load_spec(os.path.join(directory, name)) for name in IGNORE_FILENAMES if name in names]
+        if any(local_specs):
+            specs = specs + [(directory, spec) for spec in local_specs if spec]
 
-    final_files = [os.path.abspath(f) for f in unignored_files]
-    return final_files
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_ignored(entry.path, specs, is_dir=True, default=entry.name in ignored_dirs):
+                        stack.append((entry.path, specs))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if is_ignored_filename(entry.name):
+                continue
+            if not is_ignored(entry.path, specs):
+                unignored_files.append(entry.path)
 
+    return unignored_files
 
-def read_file(filepath):
-    try:
-        with open(filepath, "r", encoding="utf-8") as file:
-            return file.read(), str(filepath)
-    except Exception:
-        pass
+
+LOCKFILE_NAMES = frozenset(
+    {
+        "package-lock.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "poetry.lock",
+        "Pipfile.lock",
+        "Cargo.lock",
+        "Gemfile.lock",
+        "composer.lock",
+        "go.sum",
+    }
+)
+SNIFF_BYTES = 8192
+# Printable ASCII plus the whitespace and high bytes that show up in text encodings
+_TEXT_BYTES = bytes(range(32, 127)) + b"\n\r\t\f\b" + bytes(range(128, 256))
+# UTF-32 first, its little-endian BOM starts with the UTF-16 one
+_WIDE_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class FileReader:
+    """Reads source files for indexing, skipping content that is not worth embedding.
+
+    The first few KB of every file are sniffed for binary content and minified
+    bundles before the rest is read. NUL bytes mean binary unless the sample is
+    UTF-16/32, going by its BOM or by chardet. Files that are not UTF-8 are decoded
+    with the encoding detected by chardet. Files above `max_file_bytes` are skipped, as is
+    everything once `max_total_bytes` have been read, and large text files are
+    decoded straight from an mmap. Skipped files and bytes are counted per reason
+    in `skipped`.
+    """
+
+    def __init__(self, max_file_bytes=None, max_total_bytes=None, mmap_threshold=256 * 1024):
+        if max_file_bytes is None or max_total_bytes is None:
+            from ..config import load_config
+
+            config = load_config()
+            max_file_bytes = config["max_file_kb"] * 1024 if max_file_bytes is None else max_file_bytes
+            max_total_bytes = config["max_total_mb"] * 1024 * 1024 if max_total_bytes is None else max_total_bytes
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.mmap_threshold = mmap_threshold
+        self.total_bytes = 0
+        self.skipped = {}
+        self._lock = threading.Lock()
+
+    def _skip(self, reason, size):
+        with self._lock:
+            entry = self.skipped.setdefault(reason, {"files": 0, "bytes": 0})
+            entry["files"] += 1
+            entry["bytes"] += size
+
+    def _reserve(self, size):
+        with self._lock:
+            if self.total_bytes + size > self.max_total_bytes:
+                return False
+            self.total_bytes += size
+            return True
+
+    @staticmethod
+    def _wide_encoding(sample):
+        """The UTF-16/32 encoding of a sample that contains NUL bytes, or None if it looks binary."""
+        if b"\0" not in sample:
+            return None
+        for bom, encoding in _WIDE_BOMS:
+            if sample.startswith(bom):
+                return encoding
+        # Files written without a BOM still have a regular pattern of NUL bytes
+        detected = chardet.detect(sample)
+        encoding = (detected["encoding"] or "").lower()
+        if encoding.startswith(("utf-16", "utf-32")) and detected["confidence"] >= 0.8:
+            return encoding
+        return None
+
+    @staticmethod
+    def _sniff(sample, wide=False):
+        if not wide and b"\0" in sample:
+            return "binary"
+        if not wide and sample and len(sample.translate(None, _TEXT_BYTES)) / len(sample) > 0.3:
+            return "binary"
+        # Minified bundles are one huge line that embeds as noise
+        if len(sample) >= SNIFF_BYTES and sample.count(b"\n") < 2:
+            return "minified"
+        return None
+
+    @staticmethod
+    def _decode(buffer, sample, encoding=None):
+        if encoding:
+            try:
+                return str(buffer, encoding)
+            except UnicodeDecodeError:
+                return None
+        try:
+            return str(buffer, "utf-8-sig")
+        except UnicodeDecodeError:
+            pass
+        detected = chardet.detect(sample)
+        if not detected["encoding"] or detected["confidence"] < 0.5:
+            return None
+        try:
+            return str(buffer, detected["encoding"])
+        except (UnicodeDecodeError, LookupError):
+            return None
+
+    def read(self, filepath):
+        """Return (content, source) for a text file, or None if it was skipped."""
+        filepath = str(filepath)
+        try:
+            with open(filepath, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if os.path.basename(filepath) in LOCKFILE_NAMES:
+                    self._skip("lockfile", size)
+                    return None
+                if size > self.max_file_bytes:
+                    self._skip("too large", size)
+                    return None
+
+                sample = f.read(SNIFF_BYTES)
+                encoding = self._wide_encoding(sample)
+                reason = self._sniff(sample, wide=encoding is not None)
+                if reason:
+                    self._skip(reason, size)
+                    return None
+                if not self._reserve(size):
+                    self._skip("total size cap", size)
+                    return None
+
+                if size < self.mmap_threshold:
+                    content = self._decode(sample + f.read(), sample, encoding)
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        view = memoryview(mapped)
+                        try:
+                            content = self._decode(view, sample, encoding)
+                        finally:
+                            view.release()
+        except OSError:
+            self._skip("unreadable", 0)
+            return None
+
+        if content is None:
+            self._skip("undecodable", size)
+            return None
+        return content, filepath
+
+    def summary(self):
+        """One-line description of the skipped files, or an empty string if nothing was skipped."""
+        if not self.skipped:
+            return ""
+        files = sum(x["files"] for x in self.skipped.values())
+        size = sum(x["bytes"] for x in self.skipped.values())
+        reasons = ", ".join(f"{reason}: {x['files']}" for reason, x in sorted(self.skipped.items()))
+        return f"Skipped {files} files ({size / 1024 / 1024:.1f} MB) - {reasons}"
+
+
+def read_file(filepath, reader=None):
+    return (reader or FileReader()).read(filepath)
 
 
 def crawl_files(start_dir="."):
@@ -53,15 +374,13 @@ def crawl_files(start_dir="."):
 
     # Walk through the directory structure
     if os.path.isfile(start_dir):
-        try:
-            # Read the file content
-            with open(start_dir, "r", encoding="utf-8") as file:
-                file_content = file.read()
-                file_data.append((file_content, start_dir))
-        except Exception:
-            # If unable to read a file, you can print an error or continue to the next file
-            typer.secho(f"Unable to read file: {start_dir}", fg=typer.colors.BRIGHT_RED, bold=True)
+        reader = FileReader()
+        file_content = reader.read(start_dir)
+        if file_content is None:
+            reason = next(iter(reader.skipped))
+            typer.secho(f"Unable to read file ({reason}): {start_dir}", fg=typer.colors.BRIGHT_RED, bold=True)
             return None, None
+        file_data.append((file_content[0], start_dir))
     elif not os.path.isdir(start_dir):
         typer.secho(f"Unable to read dir: {start_dir}", fg=typer.colors.BRIGHT_RED, bold=True)
         return None, None
@@ -70,11 +389,73 @@ def crawl_files(start_dir="."):
         start_dir = os.path.abspath(start_dir)
         all_files = get_unignored_files(start_dir)
 
-        with ThreadPoolExecutor() as executor:
-            file_data = list(executor.map(read_file, all_files))
+        return read_files(all_files)
+
+    return _to_documents(file_data)
+
+
+def iter_files(filepaths, reader=None, prefetch=32):
+    """Lazily read files as (data, metadata) documents, keeping at most `prefetch` reads in flight."""
+    reader = reader or FileReader()
+    filepaths = iter(filepaths)
+    with ThreadPoolExecutor() as executor:
+        pending = deque(executor.submit(reader.read, filepath) for filepath in itertools.islice(filepaths, prefetch))
+        while pending:
+            file_data = pending.popleft().result()
+            next_filepath = next(filepaths, None)
+            if next_filepath is not None:
+                pending.append(executor.submit(reader.read, next_filepath))
+            if file_data is not None:
+                # The content is already part of the data, so the metadata only carries the source
+                content, source = file_data
+                yield source + ": " + content, {"source": source}
+
+
+def read_files(filepaths, reader=None):
+    reader = reader or FileReader()
+    with ThreadPoolExecutor() as executor:
+        file_data = list(executor.map(reader.read, filepaths))
+
+    return _to_documents([x for x in file_data if x is not None])
 
-        file_data = [x for x in file_data if x is not None]
 
+def _to_documents(file_data):
     data = [x[1] + ": " + x[0] for x in file_data]
     metadata = [dict({"data": x[0]}, **{"source": x[1]}) for x in file_data]
     return data, metadata
+
+
+if __name__ == "__main__":
+    # Benchmark: enumerate a synthetic tree (default 200k files) with nested ignore files and vendored dirs
+    import shutil
+    import sys
+    import tempfile
+    import time
+
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    root = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(root, ".gitignore"), "w") as f:
+            f.write("*.log\n/generated/\n")
+        files_per_dir = 100
+        for d in range(num_files // files_per_dir):
+            # One in ten directories lives under a dependency folder that should be pruned
+            parent = "node_modules" if d % 10 == 0 else f"pkg{d % 50}"
+            directory = os.path.join(root, parent, f"mod{d}")
+            os.makedirs(directory, exist_ok=True)
+            if d % 25 == 1:
+                with open(os.path.join(directory, ".gitignore"), "w") as f:
+                    f.write("*.tmp\n")
+            for i in range(files_per_dir):
+                extension = ".log" if i % 20 == 0 else ".tmp" if i % 20 == 1 else ".py"
+                open(os.path.join(directory, f"file{i}{extension}"), "w").close()
+
+        start_time = time.perf_counter()
+        walked = sum(len(files) for _, _, files in os.walk(root))
+        print(f"os.walk (no ignore rules): {walked} files in {time.perf_counter() - start_time:.2f}s")
+
+        start_time = time.perf_counter()
+        files = get_unignored_files(root)
+        print(f"get_unignored_files: {len(files)} files in {time.perf_counter() - start_time:.2f}s")
+    finally:
+        shutil.rmtree(root)
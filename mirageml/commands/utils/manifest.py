@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import shutil
+
+from .git_source import git_blob_hash, list_source_files
+
+PACKAGE_DIR = os.path.dirname(__file__)
+SOURCES_DIR = os.path.join(PACKAGE_DIR, "sources")
+
+
+def get_source_dir(collection_name):
+    return os.path.join(SOURCES_DIR, collection_name)
+
+
+def _manifest_path(collection_name):
+    return os.path.join(get_source_dir(collection_name), "manifest.json")
+
+
+def load_manifest(collection_name):
+    """Return the {path: {"size", "mtime", "hash"}} manifest of a local source, or None if it has none."""
+    manifest_path = _manifest_path(collection_name)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)["files"]
+
+
+def save_manifest(collection_name, files):
+    os.makedirs(get_source_dir(collection_name), exist_ok=True)
+    manifest_path = _manifest_path(collection_name)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"files": files}, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def delete_manifest(collection_name):
+    try:
+        os.remove(_manifest_path(collection_name))
+    except FileNotFoundError:
+        pass
+
+
+def load_collection_info(collection_name):
+    """Return the settings a local collection was created with, e.g. its backend and quantization."""
+    info_path = os.path.join(get_source_dir(collection_name), "collection.json")
+    if not os.path.exists(info_path):
+        return {}
+    with open(info_path, "r") as f:
+        return json.load(f)
+
+
+def save_collection_info(collection_name, info):
+    os.makedirs(get_source_dir(collection_name), exist_ok=True)
+    info_path = os.path.join(get_source_dir(collection_name), "collection.json")
+    with open(info_path + ".tmp", "w") as f:
+        json.dump(info, f)
+    os.replace(info_path + ".tmp", info_path)
+
+
+def delete_source_dir(collection_name):
+    shutil.rmtree(get_source_dir(collection_name), ignore_errors=True)
+
+
+def hash_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def diff_manifest(old_files, filepaths, known_hashes=None, hash_function=hash_file):
+    """Compare the current files against a manifest.
+
+    Files in `known_hashes` (e.g. blob ids from the git index) are compared by
+    that hash alone. Other files whose size and mtime are unchanged are assumed
+    unchanged without being read; everything else is hashed with `hash_function`.
+    Returns (added, modified, removed, files) where `files` is the manifest for
+    the current state.
+    """
+    old_files = old_files or {}
+    known_hashes = known_hashes or {}
+    added, modified, files = [], [], {}
+    for filepath in filepaths:
+        filepath = str(filepath)
+        old_entry = old_files.get(filepath)
+        if filepath in known_hashes:
+            entry = {"hash": known_hashes[filepath]}
+        else:
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+            if old_entry and old_entry.get("size") == entry["size"] and old_entry.get("mtime") == entry["mtime"]:
+                files[filepath] = old_entry
+                continue
+
+            try:
+                entry["hash"] = hash_function(filepath)
+            except OSError:
+                continue
+
+        files[filepath] = entry
+        if old_entry is None:
+            added.append(filepath)
+        elif old_entry["hash"] != entry["hash"]:
+            modified.append(filepath)
+
+    removed = [filepath for filepath in old_files if filepath not in files]
+    return added, modified, removed, files
+
+
+def diff_source(old_files, start_dir):
+    """Diff a local source directory against its manifest, using the git index when available."""
+    filepaths, known_hashes = list_source_files(start_dir)
+    if known_hashes is None:
+        return diff_manifest(old_files, filepaths)
+    return diff_manifest(old_files, filepaths, known_hashes, hash_function=git_blob_hash)
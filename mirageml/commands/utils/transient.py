@@ -0,0 +1,87 @@
+import os
+
+from ..config import load_config
+from .llm import local_get_embedding
+from .local_source import crawl_files
+from .vectordb import build_transient_index
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class TransientSources:
+    """The files and URLs of a chat session, embedded once and searched on every turn.
+
+    Each source gets its own in-memory index the first time it is searched. Files
+    are re-read, and their index rebuilt, only when their mtime changes.
+    """
+
+    def __init__(self, embedding_model=None):
+        self.embedding_model = embedding_model
+        self._entries = []
+
+    def add(self, name, data, metadata, path=None):
+        """Add an extracted source; `path` is the file to watch for changes."""
+        self._entries.append(
+            {
+                "name": name,
+                "data": data,
+                "metadata": metadata,
+                "path": path,
+                "mtime": _mtime(path) if path is not None else None,
+                "index": None,
+            }
+        )
+
+    def __len__(self):
+        return sum(1 for entry in self._entries if entry["data"])
+
+    def __iter__(self):
+        return ((entry["data"], entry["metadata"]) for entry in self._entries if entry["data"])
+
+    def _drop_index(self, entry):
+        if entry["index"] is not None:
+            entry["index"][0].close()
+            entry["index"] = None
+
+    def refresh(self):
+        """Re-read the files that changed since they were read; returns their names."""
+        changed = []
+        for entry in self._entries:
+            if entry["path"] is None:
+                continue
+            mtime = _mtime(entry["path"])
+            if mtime == entry["mtime"]:
+                continue
+            data, metadata = crawl_files(entry["path"]) if mtime is not None else (None, None)
+            entry.update(data=data or [], metadata=metadata or [], mtime=mtime)
+            self._drop_index(entry)
+            changed.append(entry["name"])
+        return changed
+
+    def search(self, user_input, limit=20):
+        self.refresh()
+        if self.embedding_model is None:
+            self.embedding_model = load_config()["embedding_model"]
+        search_vector = local_get_embedding([user_input], self.embedding_model, as_numpy=True)[0]
+
+        hits = []
+        for entry in self._entries:
+            if not entry["data"]:
+                continue
+            if entry["index"] is None:
+                entry["index"] = build_transient_index(entry["data"], entry["metadata"], self.embedding_model)
+            store, collection_name = entry["index"]
+            hits.extend(
+                {"score": hit["score"], "payload": hit["payload"]}
+                for hit in store.search(collection_name, search_vector, limit=limit)
+            )
+        return hits
+
+    def close(self):
+        for entry in self._entries:
+            self._drop_index(entry)
@@ -0,0 +1,641 @@
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+
+import numpy as np
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    PointStruct,
+    QuantizationSearchParams,
+    Record,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+from .common import SQL_BATCH, batched, normalize
+from .manifest import SOURCES_DIR, get_source_dir
+
+QUANTIZATION_LEVELS = ("none", "int8", "binary")
+# Quantized searches rescore `limit` * oversampling candidates with the full-precision vectors
+_OVERSAMPLING = {"int8": 4, "binary": 16}
+# Rows scanned per block when scoring quantized codes; int8 blocks are cast to float32, which is
+# fastest while a block stays in the CPU cache
+_SCAN_BLOCK = 1024
+# Set bits of every 16-bit value, for the Hamming distances between binary codes
+_POPCOUNT16 = np.unpackbits(np.arange(1 << 16, dtype=np.uint16).view(np.uint8).reshape(-1, 2), axis=1).sum(
+    axis=1, dtype=np.uint8
+)
+
+
+def _select_fields(payload, fields):
+    return payload if fields is None else {key: payload[key] for key in fields if key in payload}
+
+
+class VectorStore(ABC):
+    """Interface of the local vector stores behind `vectordb.py`.
+
+    A collection holds points with an id, a vector and a JSON payload. Scores are
+    cosine similarities. Points belong to the sources named by their `source` and
+    `sources` payload keys.
+    """
+
+    @abstractmethod
+    def list_collections(self):
+        ...
+
+    def has_collection(self, collection_name):
+        return collection_name in self.list_collections()
+
+    @abstractmethod
+    def create_collection(self, collection_name, dim, quantization="none"):
+        """Create an empty collection, replacing any existing one.
+
+        With `quantization` set to "int8" or "binary" searches run over quantized codes
+        and rescore the best candidates with the full-precision vectors.
+        """
+
+    @abstractmethod
+    def delete_collection(self, collection_name):
+        ...
+
+    @abstractmethod
+    def count(self, collection_name):
+        ...
+
+    @abstractmethod
+    def upsert(self, collection_name, points, batch_size=512, parallel=1):
+        """Insert or overwrite an iterable of (id, vector, payload) points."""
+
+    @abstractmethod
+    def search(self, collection_name, vector, limit):
+        """Return the `limit` nearest points as {"id", "score", "payload"} dicts, best first."""
+
+    @abstractmethod
+    def scroll(self, collection_name, fields=None, sources=None):
+        """Iterate over the (id, payload) of all points, or of the points of `sources`.
+
+        Only the payload keys in `fields` are returned when it is given.
+        """
+
+    @abstractmethod
+    def delete(self, collection_name, ids):
+        ...
+
+    @abstractmethod
+    def set_payload(self, collection_name, ids, payload):
+        """Set the keys of `payload` on the points `ids`."""
+
+    def close(self):
+        pass
+
+
+class QdrantVectorStore(VectorStore):
+    """Vector store backed by a Qdrant client, e.g. the embedded local mode.
+
+    A client shared with other stores is handed back through `on_close` instead of being closed.
+    """
+
+    name = "qdrant"
+
+    def __init__(self, client, on_close=None):
+        self.client = client
+        self._on_close = on_close
+
+    def list_collections(self):
+        return [collection.name for collection in self.client.get_collections().collections]
+
+    def create_collection(self, collection_name, dim, quantization="none"):
+        quantization_config = None
+        if quantization == "int8":
+            quantization_config = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        elif quantization == "binary":
+            quantization_config = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        self.client.recreate_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+            quantization_config=quantization_config,
+        )
+
+    def delete_collection(self, collection_name):
+        self.client.delete_collection(collection_name=collection_name)
+
+    def count(self, collection_name):
+        return self.client.count(collection_name=collection_name).count
+
+    def upsert(self, collection_name, points, batch_size=512, parallel=1):
+        points = ((id, _as_list(vector), payload) for id, vector, payload in points)
+        if parallel > 1:
+            self.client.upload_records(
+                collection_name=collection_name,
+                records=(Record(id=id, vector=vector, payload=payload) for id, vector, payload in points),
+                batch_size=batch_size,
+                parallel=parallel,
+            )
+            return
+        for batch in batched(points, batch_size):
+            self.client.upsert(
+                collection_name=collection_name,
+                points=[PointStruct(id=id, vector=vector, payload=payload) for id, vector, payload in batch],
+            )
+
+    def search(self, collection_name, vector, limit):
+        # Only applies to quantized collections on a Qdrant server; the embedded local mode always searches exactly
+        search_params = SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=2.0))
+        hits = self.client.search(
+            collection_name=collection_name, query_vector=_as_list(vector), search_params=search_params, limit=limit
+        )
+        return [{"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in hits]
+
+    def _scroll(self, collection_name, fields, points_filter):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=points_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=fields if fields is not None else True,
+                with_vectors=False,
+            )
+            for point in points:
+                yield point.id, point.payload or {}
+            if offset is None:
+                break
+
+    def scroll(self, collection_name, fields=None, sources=None):
+        if sources is None:
+            yield from self._scroll(collection_name, fields, None)
+            return
+        seen = set()
+        for i in range(0, len(sources), 256):
+            batch = list(sources[i : i + 256])
+            points_filter = Filter(
+                should=[
+                    FieldCondition(key="source", match=MatchAny(any=batch)),
+                    FieldCondition(key="sources", match=MatchAny(any=batch)),
+                ]
+            )
+            for point_id, payload in self._scroll(collection_name, fields, points_filter):
+                if point_id not in seen:
+                    seen.add(point_id)
+                    yield point_id, payload
+
+    def delete(self, collection_name, ids):
+        ids = list(ids)
+        for i in range(0, len(ids), 1024):
+            self.client.delete(collection_name=collection_name, points_selector=ids[i : i + 1024])
+
+    def set_payload(self, collection_name, ids, payload):
+        self.client.set_payload(collection_name=collection_name, payload=payload, points=list(ids))
+
+    def close(self):
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+        else:
+            self.client.close()
+
+
+def _as_list(vector):
+    return vector.tolist() if isinstance(vector, np.ndarray) else vector
+
+
+def _quantize(vectors, quantization):
+    """Return the (codes, scales) of normalized vectors: int8 codes with a scale per row, or packed sign bits."""
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    bits = np.packbits(vectors > 0, axis=-1)
+    # Pad to whole 16-bit words
+    if bits.shape[-1] % 2:
+        bits = np.concatenate([bits, np.zeros(bits.shape[:-1] + (1,), dtype=np.uint8)], axis=-1)
+    return bits, None
+
+
+def _point_sources(payload):
+    sources = set(payload.get("sources") or [])
+    if payload.get("source") is not None:
+        sources.add(payload["source"])
+    return [str(source) for source in sources]
+
+
+_FLAT_FILES = ("vectors.npy", "codes.npy", "scales.npy", "points.sqlite3", "points.sqlite3-wal", "points.sqlite3-shm")
+
+
+class _FlatCollection:
+    """One flat collection: normalized float32 vectors in a memory-mapped `.npy` file and
+    the id -> row mapping and payloads in SQLite. Rows of deleted points are reused.
+
+    Quantized collections also keep int8 or binary codes of the vectors in `codes.npy`
+    (and the int8 scales in `scales.npy`). Searches scan the codes and only read the
+    float32 rows of the candidates they rescore.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._conn = sqlite3.connect(os.path.join(directory, "points.sqlite3"), check_same_thread=False, timeout=30)
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._codes = self._scales = None
+        if os.path.exists(self._path("codes.npy")):
+            self._codes = np.load(self._path("codes.npy"), mmap_mode="r+")
+        if os.path.exists(self._path("scales.npy")):
+            self._scales = np.load(self._path("scales.npy"), mmap_mode="r+")
+        rows = np.fromiter((row for (row,) in self._conn.execute("SELECT row FROM points")), dtype=np.int64)
+        self._size = int(rows.max()) + 1 if len(rows) else 0
+        self._valid = np.zeros(len(self._vectors), dtype=bool)
+        self._valid[rows] = True
+        self._free = np.flatnonzero(~self._valid[: self._size]).tolist()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def create(directory, dim, quantization="none", capacity=1024):
+        if quantization not in QUANTIZATION_LEVELS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {', '.join(QUANTIZATION_LEVELS)}")
+        os.makedirs(directory, exist_ok=True)
+        for name in _FLAT_FILES:
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        conn = sqlite3.connect(os.path.join(directory, "points.sqlite3"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE points (id TEXT PRIMARY KEY, row INTEGER UNIQUE, payload TEXT)")
+        conn.execute("CREATE TABLE point_sources (source TEXT, id TEXT)")
+        conn.execute("CREATE INDEX point_sources_source ON point_sources(source)")
+        conn.execute("CREATE INDEX point_sources_id ON point_sources(id)")
+        conn.commit()
+        conn.close()
+
+        arrays = {"vectors.npy": (np.float32, (capacity, dim))}
+        if quantization == "int8":
+            arrays["codes.npy"] = (np.int8, (capacity, dim))
+            arrays["scales.npy"] = (np.float32, (capacity,))
+        elif quantization == "binary":
+            arrays["codes.npy"] = (np.uint8, (capacity, (dim + 15) // 16 * 2))
+        for name, (dtype, shape) in arrays.items():
+            array = np.lib.format.open_memmap(os.path.join(directory, name), mode="w+", dtype=dtype, shape=shape)
+            array.flush()
+            del array
+
+    @property
+    def dim(self):
+        return self._vectors.shape[1]
+
+    @property
+    def quantization(self):
+        if self._codes is None:
+            return "none"
+        return "int8" if self._codes.dtype == np.int8 else "binary"
+
+    def _grow_array(self, name, array, capacity):
+        grown_path = self._path(name) + ".tmp"
+        grown = np.lib.format.open_memmap(grown_path, mode="w+", dtype=array.dtype, shape=(capacity,) + array.shape[1:])
+        grown[: len(array)] = array
+        grown.flush()
+        del grown
+        array.flush()
+        del array
+        os.replace(grown_path, self._path(name))
+        return np.load(self._path(name), mmap_mode="r+")
+
+    def _grow(self, capacity):
+        capacity = max(capacity, 2 * len(self._vectors))
+        # Drop our references to the old maps before they are replaced
+        vectors, self._vectors = self._vectors, None
+        self._vectors = self._grow_array("vectors.npy", vectors, capacity)
+        if self._codes is not None:
+            codes, self._codes = self._codes, None
+            self._codes = self._grow_array("codes.npy", codes, capacity)
+        if self._scales is not None:
+            scales, self._scales = self._scales, None
+            self._scales = self._grow_array("scales.npy", scales, capacity)
+        self._valid = np.concatenate([self._valid, np.zeros(capacity - len(self._valid), dtype=bool)])
+
+    def _rows(self, ids):
+        rows = {}
+        for i in range(0, len(ids), SQL_BATCH):
+            batch = ids[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(self._conn.execute(f"SELECT id, row FROM points WHERE id IN ({placeholders})", batch))
+        return rows
+
+    def _set_sources(self, items):
+        self._conn.executemany("DELETE FROM point_sources WHERE id = ?", [(point_id,) for point_id, _ in items])
+        self._conn.executemany(
+            "INSERT INTO point_sources VALUES (?, ?)",
+            [(source, point_id) for point_id, payload in items for source in _point_sources(payload)],
+        )
+
+    def upsert(self, points):
+        # Later copies of an id in the same batch win
+        points = list(
+            {str(point_id): (str(point_id), vector, payload) for point_id, vector, payload in points}.values()
+        )
+        ids = [point_id for point_id, _, _ in points]
+        existing = self._rows(ids)
+        rows = []
+        for point_id in ids:
+            if point_id in existing:
+                rows.append(existing[point_id])
+            elif self._free:
+                rows.append(self._free.pop())
+            else:
+                rows.append(self._size)
+                self._size += 1
+        if self._size > len(self._vectors):
+            self._grow(self._size)
+
+        vectors = normalize([vector for _, vector, _ in points])
+        self._vectors[rows] = vectors
+        if self._codes is not None:
+            codes, scales = _quantize(vectors, self.quantization)
+            self._codes[rows] = codes
+            if scales is not None:
+                self._scales[rows] = scales
+        self._valid[rows] = True
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+            [(point_id, row, json.dumps(payload)) for (point_id, _, payload), row in zip(points, rows)],
+        )
+        self._set_sources([(point_id, payload) for point_id, _, payload in points])
+        self._conn.commit()
+
+    def _approximate_scores(self, query):
+        """Score every row against the normalized query using the quantized codes only."""
+        scores = np.empty(self._size, dtype=np.float32)
+        if self.quantization == "binary":
+            query_bits = _quantize(query, "binary")[0].view(np.uint16)
+        for start in range(0, self._size, _SCAN_BLOCK):
+            end = min(start + _SCAN_BLOCK, self._size)
+            if self.quantization == "binary":
+                # Fewer differing sign bits means a smaller angle
+                distances = _POPCOUNT16[self._codes[start:end].view(np.uint16) ^ query_bits]
+                scores[start:end] = -distances.sum(axis=1, dtype=np.int32)
+            else:
+                scores[start:end] = (self._codes[start:end] @ query) * self._scales[start:end]
+        return scores
+
+    def search(self, vector, limit):
+        num_valid = int(self._valid[: self._size].sum())
+        k = min(limit, num_valid)
+        if k <= 0:
+            return []
+        query = normalize(vector)
+        if self._codes is None:
+            # One matrix-vector product over the memory-mapped vectors, then a partial sort for the top k
+            scores = self._vectors[: self._size] @ query
+        else:
+            scores = self._approximate_scores(query)
+        if num_valid < self._size:
+            scores[~self._valid[: self._size]] = -np.inf
+        if self._codes is None:
+            top = np.argpartition(scores, self._size - k)[self._size - k :]
+        else:
+            # Rescore the best candidates of the quantized scan with their full-precision vectors
+            num_candidates = min(k * _OVERSAMPLING[self.quantization], num_valid)
+            candidates = np.sort(np.argpartition(scores, self._size - num_candidates)[self._size - num_candidates :])
+            scores = np.full(self._size, -np.inf, dtype=np.float32)
+            scores[candidates] = self._vectors[candidates] @ query
+            top = candidates[np.argpartition(scores[candidates], num_candidates - k)[num_candidates - k :]]
+        top = top[np.argsort(-scores[top])]
+
+        placeholders = ",".join("?" * len(top))
+        found = {
+            row: (point_id, payload)
+            for point_id, row, payload in self._conn.execute(
+                f"SELECT id, row, payload FROM points WHERE row IN ({placeholders})", [int(row) for row in top]
+            )
+        }
+        return [
+            {"id": found[row][0], "score": float(scores[row]), "payload": json.loads(found[row][1])}
+            for row in top.tolist()
+        ]
+
+    def scroll(self, fields=None, sources=None):
+        if sources is None:
+            for point_id, payload in self._conn.execute("SELECT id, payload FROM points").fetchall():
+                yield point_id, _select_fields(json.loads(payload), fields)
+            return
+        seen = set()
+        sources = [str(source) for source in sources]
+        for i in range(0, len(sources), SQL_BATCH):
+            batch = sources[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                "SELECT points.id, points.payload FROM points JOIN point_sources ON points.id = point_sources.id "
+                f"WHERE point_sources.source IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for point_id, payload in rows:
+                if point_id not in seen:
+                    seen.add(point_id)
+                    yield point_id, _select_fields(json.loads(payload), fields)
+
+    def delete(self, ids):
+        ids = [str(point_id) for point_id in ids]
+        rows = list(self._rows(ids).values())
+        self._conn.executemany("DELETE FROM points WHERE id = ?", [(point_id,) for point_id in ids])
+        self._conn.executemany("DELETE FROM point_sources WHERE id = ?", [(point_id,) for point_id in ids])
+        self._conn.commit()
+        self._valid[rows] = False
+        self._free.extend(rows)
+
+    def set_payload(self, ids, payload):
+        ids = [str(point_id) for point_id in ids]
+        updated = []
+        for i in range(0, len(ids), SQL_BATCH):
+            batch = ids[i : i + SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for point_id, current in self._conn.execute(
+                f"SELECT id, payload FROM points WHERE id IN ({placeholders})", batch
+            ).fetchall():
+                updated.append((point_id, dict(json.loads(current), **payload)))
+        self._conn.executemany(
+            "UPDATE points SET payload = ? WHERE id = ?",
+            [(json.dumps(new_payload), point_id) for point_id, new_payload in updated],
+        )
+        if "source" in payload or "sources" in payload:
+            self._set_sources(updated)
+        self._conn.commit()
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def close(self):
+        for array in (self._vectors, self._codes, self._scales):
+            if array is not None:
+                array.flush()
+        self._vectors = self._codes = self._scales = None
+        self._conn.close()
+
+
+class FlatVectorStore(VectorStore):
+    """Vector store that keeps each collection in a memory-mapped float32 `.npy` file in its source
+    directory and answers queries by brute force, which stays fast far past the point where the
+    pure-Python Qdrant local mode slows down."""
+
+    name = "flat"
+
+    def __init__(self):
+        self._collections = {}
+
+    @staticmethod
+    def collection_exists(collection_name):
+        return os.path.exists(os.path.join(get_source_dir(collection_name), "vectors.npy"))
+
+    def _collection(self, collection_name):
+        if collection_name not in self._collections:
+            self._collections[collection_name] = _FlatCollection(get_source_dir(collection_name))
+        return self._collections[collection_name]
+
+    def list_collections(self):
+        if not os.path.isdir(SOURCES_DIR):
+            return []
+        return sorted(name for name in os.listdir(SOURCES_DIR) if self.collection_exists(name))
+
+    def has_collection(self, collection_name):
+        return self.collection_exists(collection_name)
+
+    def create_collection(self, collection_name, dim, quantization="none"):
+        self._close_collection(collection_name)
+        _FlatCollection.create(get_source_dir(collection_name), dim, quantization=quantization)
+
+    def delete_collection(self, collection_name):
+        self._close_collection(collection_name)
+        for name in _FLAT_FILES:
+            path = os.path.join(get_source_dir(collection_name), name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def count(self, collection_name):
+        return self._collection(collection_name).count()
+
+    def upsert(self, collection_name, points, batch_size=512, parallel=1):
+        collection = self._collection(collection_name)
+        for batch in batched(points, batch_size):
+            collection.upsert(batch)
+
+    def search(self, collection_name, vector, limit):
+        return self._collection(collection_name).search(vector, limit)
+
+    def scroll(self, collection_name, fields=None, sources=None):
+        return self._collection(collection_name).scroll(fields=fields, sources=sources)
+
+    def delete(self, collection_name, ids):
+        self._collection(collection_name).delete(ids)
+
+    def set_payload(self, collection_name, ids, payload):
+        self._collection(collection_name).set_payload(ids, payload)
+
+    def _close_collection(self, collection_name):
+        collection = self._collections.pop(collection_name, None)
+        if collection is not None:
+            collection.close()
+
+    def close(self):
+        for collection_name in list(self._collections):
+            self._close_collection(collection_name)
+
+
+class MemoryVectorStore(VectorStore):
+    """Vector store that keeps each collection in one contiguous float32 matrix in this process.
+
+    Queries are a single matrix-vector product plus a partial sort. Nothing is persisted,
+    which suits small indexes that only live for a session, like the files of a chat.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._collections = {}
+
+    def list_collections(self):
+        return list(self._collections)
+
+    def create_collection(self, collection_name, dim, quantization="none"):
+        self._collections[collection_name] = {
+            "vectors": np.empty((256, dim), dtype=np.float32),
+            "ids": [],
+            "payloads": [],
+            "rows": {},
+        }
+
+    def delete_collection(self, collection_name):
+        self._collections.pop(collection_name, None)
+
+    def count(self, collection_name):
+        return len(self._collections[collection_name]["ids"])
+
+    def upsert(self, collection_name, points, batch_size=512, parallel=1):
+        collection = self._collections[collection_name]
+        for batch in batched(points, batch_size):
+            vectors = normalize([vector for _, vector, _ in batch])
+            for (point_id, _, payload), vector in zip(batch, vectors):
+                row = collection["rows"].get(point_id)
+                if row is None:
+                    row = collection["rows"][point_id] = len(collection["ids"])
+                    collection["ids"].append(point_id)
+                    collection["payloads"].append(payload)
+                    if row >= len(collection["vectors"]):
+                        grown = np.empty((2 * len(collection["vectors"]), vectors.shape[1]), dtype=np.float32)
+                        grown[:row] = collection["vectors"][:row]
+                        collection["vectors"] = grown
+                else:
+                    collection["payloads"][row] = payload
+                collection["vectors"][row] = vector
+
+    def search(self, collection_name, vector, limit):
+        collection = self._collections[collection_name]
+        size = len(collection["ids"])
+        k = min(limit, size)
+        if k <= 0:
+            return []
+        scores = collection["vectors"][:size] @ normalize(vector)
+        top = np.argpartition(scores, size - k)[size - k :]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": collection["ids"][row], "score": float(scores[row]), "payload": dict(collection["payloads"][row])}
+            for row in top.tolist()
+        ]
+
+    def scroll(self, collection_name, fields=None, sources=None):
+        collection = self._collections[collection_name]
+        sources = None if sources is None else {str(source) for source in sources}
+        for point_id, payload in zip(list(collection["ids"]), list(collection["payloads"])):
+            if sources is None or sources.intersection(_point_sources(payload)):
+                yield point_id, _select_fields(payload, fields)
+
+    def delete(self, collection_name, ids):
+        collection = self._collections[collection_name]
+        deleted = {collection["rows"][point_id] for point_id in ids if point_id in collection["rows"]}
+        if not deleted:
+            return
+        keep = [row for row in range(len(collection["ids"])) if row not in deleted]
+        collection["vectors"][: len(keep)] = collection["vectors"][keep]
+        collection["ids"] = [collection["ids"][row] for row in keep]
+        collection["payloads"] = [collection["payloads"][row] for row in keep]
+        collection["rows"] = {point_id: row for row, point_id in enumerate(collection["ids"])}
+
+    def set_payload(self, collection_name, ids, payload):
+        collection = self._collections[collection_name]
+        for point_id in ids:
+            row = collection["rows"].get(point_id)
+            if row is not None:
+                collection["payloads"][row] = dict(collection["payloads"][row], **payload)
+
+    def vectors(self, collection_name):
+        """The (ids, payloads, vectors) of a collection, e.g. to move it to another store."""
+        collection = self._collections[collection_name]
+        return collection["ids"], collection["payloads"], collection["vectors"][: len(collection["ids"])]
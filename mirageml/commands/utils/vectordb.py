@@ -1,12 +1,19 @@
+import atexit
+import functools
+import heapq
+import itertools
 import json
 import os
+import queue
+import threading
+import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import keyring
-import requests
+import numpy as np
 import typer
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, PointStruct, VectorParams
 from rich.console import Console
 from rich.live import Live
 from rich.panel import Panel
@@ -19,27 +26,226 @@ from ...constants import (
     VECTORDB_LIST_ENDPOINT,
     VECTORDB_SEARCH_ENDPOINT,
     get_headers,
+    http_client,
 )
+from ..config import load_config
 from ..list_sources import set_sources
-from .llm import _chunk_data, local_get_embedding
-from .local_source import crawl_files
+from .chunk_store import open_chunk_store
+from .common import normalize
+from .indexer import index_documents
+from .llm import DEFAULT_EMBEDDING_MODEL, embedding_dimension, local_get_embedding
+from .local_source import FileReader, crawl_files, iter_files
+from .manifest import (
+    delete_manifest,
+    delete_source_dir,
+    diff_source,
+    load_collection_info,
+    load_manifest,
+    save_collection_info,
+    save_manifest,
+)
+from .reducer import MATRYOSHKA_MODELS, REDUCERS, VectorReducer, load_reducer, save_reducer
+from .vector_store import QUANTIZATION_LEVELS, FlatVectorStore, MemoryVectorStore, QdrantVectorStore
 from .web_source import crawl_website
 
 PACKAGE_DIR = os.path.dirname(__file__)
+STORAGE_LOCK = "mirage.lock"
+# Chunks sampled to calibrate the scores of a collection, see `calibrate_collection`
+CALIBRATION_SAMPLE = 64
+MIN_CALIBRATION_SAMPLE = 8
 
 progress = Progress()
 
 
+class _OwnerThread:
+    """A thread that runs every call made on the embedded Qdrant client.
+
+    Embedded Qdrant keeps its points in sqlite connections that may only be used, and closed,
+    by the thread that opened them, so the client is opened, used and closed on this one thread.
+    """
+
+    def __init__(self):
+        self._calls = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="local-qdrant", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            func, args, kwargs, future = self._calls.get()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def call(self, func, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            return func(*args, **kwargs)
+        future = Future()
+        self._calls.put((func, args, kwargs, future))
+        return future.result()
+
+
+class _OwnedClient:
+    """Proxy of a QdrantClient that runs its methods on the owner thread."""
+
+    def __init__(self, client, owner):
+        self._client = client
+        self._owner = owner
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        return functools.partial(self._owner.call, attr)
+
+
+class LocalQdrant:
+    """The embedded Qdrant client of this process, shared by every local store.
+
+    The client loads all local collections once. While it is open the process
+    holds a lock file in the storage folder, so other mirage processes wait for
+    it (up to `lock_timeout` seconds) before they open their own client. Stores acquire
+    the client and release it when they close; once it has been unused for
+    `idle_timeout` seconds it is closed so that other processes can get in.
+    All client calls, including the close of the idle reaper and at exit, run
+    on one owner thread, so they never run concurrently.
+    """
+
+    def __init__(self, path=PACKAGE_DIR, idle_timeout=None, lock_timeout=None):
+        self.path = path
+        self._idle_timeout = idle_timeout
+        self._lock_timeout = lock_timeout
+        self._client = None
+        self._owner = None
+        self._storage_lock = None
+        self._users = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.loads = 0
+
+    def _config(self):
+        if self._idle_timeout is None or self._lock_timeout is None:
+            config = load_config()
+            self._idle_timeout = config["qdrant_idle_timeout"] if self._idle_timeout is None else self._idle_timeout
+            self._lock_timeout = config["qdrant_lock_timeout"] if self._lock_timeout is None else self._lock_timeout
+
+    def _lock_storage(self):
+        import portalocker
+
+        lock = portalocker.Lock(os.path.join(self.path, STORAGE_LOCK), timeout=self._lock_timeout)
+        try:
+            lock.acquire(fail_when_locked=True)
+        except portalocker.AlreadyLocked:
+            typer.secho("Waiting for another mirage process to release the local sources...", fg=typer.colors.YELLOW)
+            try:
+                lock.acquire()
+            except portalocker.LockException:
+                raise RuntimeError(
+                    f"The local sources are locked by another mirage process (waited {self._lock_timeout}s)"
+                )
+        return lock
+
+    def _open(self):
+        # Waiting on a lock of our own is cheap, while every failed attempt to open the client
+        # would load all collections before Qdrant's lock check, and leak its file handles
+        self._storage_lock = self._lock_storage()
+        if self._owner is None:
+            self._owner = _OwnerThread()
+        try:
+            client = self._owner.call(QdrantClient, path=self.path)
+        except BaseException:
+            self._storage_lock.release()
+            self._storage_lock = None
+            raise
+        self.loads += 1
+        return _OwnedClient(client, self._owner)
+
+    def acquire(self):
+        with self._lock:
+            self._config()
+            if self._client is None:
+                self._client = self._open()
+            self._users += 1
+            return self._client
+
+    def release(self):
+        with self._lock:
+            self._users = max(self._users - 1, 0)
+            self._last_used = time.monotonic()
+            if self._users == 0:
+                if self._idle_timeout <= 0:
+                    self._close()
+                else:
+                    self._schedule_reaper()
+
+    def _schedule_reaper(self, delay=None):
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Timer(self._idle_timeout if delay is None else delay, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        with self._lock:
+            self._reaper = None
+            if self._client is None or self._users:
+                return
+            idle = time.monotonic() - self._last_used
+            if idle >= self._idle_timeout:
+                self._close()
+            else:
+                self._schedule_reaper(self._idle_timeout - idle)
+
+    def _close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            # Runs on the owner thread, which releases Qdrant's own lock
+            client.close()
+            self._storage_lock.release()
+            self._storage_lock = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+local_qdrant = LocalQdrant()
+atexit.register(local_qdrant.close)
+
+
 def get_local_qdrant_db():
-    QDRANT_LOCKFILE_PATH = os.path.join(PACKAGE_DIR, ".lock")
-    if os.path.exists(QDRANT_LOCKFILE_PATH):
-        os.remove(QDRANT_LOCKFILE_PATH)
-    return QdrantClient(path=PACKAGE_DIR)
+    """Return the shared local Qdrant client; pair every call with `local_qdrant.release()`."""
+    return local_qdrant.acquire()
+
+
+def _list_qdrant_collections():
+    QDRANT_JSON_PATH = os.path.join(PACKAGE_DIR, "meta.json")
+    if not os.path.exists(QDRANT_JSON_PATH):
+        return []
+    with open(QDRANT_JSON_PATH) as json_file:
+        return list(json.load(json_file)["collections"].keys())
+
+
+def get_vector_store(collection_name=None):
+    """Return the vector store holding `collection_name`, or the configured backend for a new collection."""
+    if collection_name is not None:
+        if FlatVectorStore.collection_exists(collection_name):
+            return FlatVectorStore()
+        if collection_name in _list_qdrant_collections():
+            return QdrantVectorStore(get_local_qdrant_db(), on_close=local_qdrant.release)
+    if load_config()["vector_store_backend"] == "flat":
+        return FlatVectorStore()
+    return QdrantVectorStore(get_local_qdrant_db(), on_close=local_qdrant.release)
+
+
+def collection_embedding_model(collection_name):
+    # Collections created before the model was recorded were embedded with the default model
+    return load_collection_info(collection_name).get("model", DEFAULT_EMBEDDING_MODEL)
 
 
 def exists_qdrant_db(collection_name="test"):
-    qdrant_client = get_local_qdrant_db()
-    return collection_name in [x.name for x in qdrant_client.get_collections().collections]
+    return collection_name in list_local_qdrant_db()
 
 
 def create_remote_qdrant_db(collection_name, link=None, path=None):
@@ -57,7 +263,10 @@ def create_remote_qdrant_db(collection_name, link=None, path=None):
             "collection_name": collection_name,
             "url": link,
         }
-        response = requests.post(VECTORDB_CREATE_WEB_COLLECTION, json=json_data, headers=get_headers(), stream=True)
+        # Not retried: the server may have started the crawl before a gateway error, and a retry would start another
+        response = http_client.post(
+            VECTORDB_CREATE_WEB_COLLECTION, json=json_data, headers=get_headers(), stream=True, retries=0
+        )
         if response.status_code == 200:
             for chunk in response.iter_lines():
                 link = chunk.decode("utf-8")
@@ -68,16 +277,153 @@ def create_remote_qdrant_db(collection_name, link=None, path=None):
     return True
 
 
-def create_local_qdrant_db(collection_name="test", link=None, path=None):
-    data, metadata = [], []
-    if link:
-        data, metadata = crawl_website(link)
-    elif path:
-        data, metadata = crawl_files(path)
+def _delete_sources(store, collection_name, sources, chunk_store=None):
+    """Delete the points of `sources`; deduplicated points shared with other sources only lose these sources."""
+    removed = set(sources)
+    delete_ids, remaining_sources = [], {}
+    for point_id, payload in store.scroll(collection_name, fields=["source", "sources"], sources=sources):
+        remaining = [x for x in payload.get("sources", []) if x not in removed]
+        if remaining:
+            remaining_sources[point_id] = remaining
+        else:
+            delete_ids.append(point_id)
+
+    store.delete(collection_name, delete_ids)
+    if chunk_store is not None:
+        chunk_store.release(delete_ids)
+        chunk_store.delete_hashes(delete_ids)
+        chunk_store.set_hash_sources(remaining_sources)
+    by_sources = {}
+    for point_id, remaining in remaining_sources.items():
+        by_sources.setdefault(tuple(remaining), []).append(point_id)
+    for remaining, point_ids in by_sources.items():
+        store.set_payload(collection_name, point_ids, {"source": remaining[0], "sources": list(remaining)})
+
+
+def sync_local_qdrant_db(collection_name, path, workers=None, live=None):
+    """Bring an existing local source up to date with `path`, embedding only the files that changed."""
+    store = get_vector_store(collection_name)
+    chunk_store = open_chunk_store(collection_name)
+    try:
+        added, modified, removed, files = diff_source(load_manifest(collection_name), os.path.abspath(path))
+        if removed or modified:
+            _delete_sources(store, collection_name, removed + modified, chunk_store=chunk_store)
+
+        reader = FileReader()
+        reducer = load_reducer(collection_name)
+        stats = index_documents(
+            store,
+            collection_name,
+            iter_files(added + modified, reader=reader),
+            workers=workers,
+            existing=True,
+            chunk_store=chunk_store,
+            embedding_model_id=collection_embedding_model(collection_name),
+            reducer=reducer,
+            live=live,
+        )
+    finally:
+        # Always release the store, or the shared Qdrant client keeps its lock
+        chunk_store.close()
+        store.close()
+    if reducer is not None:
+        save_reducer(collection_name, reducer)
+    save_manifest(collection_name, files)
+
+    return {
+        "added": added,
+        "modified": modified,
+        "removed": removed,
+        "unchanged": len(files) - len(added) - len(modified),
+        "stats": stats,
+        "skipped": reader.summary(),
+    }
 
-    qdrant_client = get_local_qdrant_db()
 
-    final_data, final_metadata = [], []
+def create_local_qdrant_db(
+    collection_name="test",
+    link=None,
+    path=None,
+    workers=None,
+    report_memory=False,
+    quantization=None,
+    embedding_model=None,
+    reducer=None,
+    reduced_dim=None,
+):
+    config = load_config()
+    requested_quantization = quantization
+    quantization = quantization or config["quantization"]
+    embedding_model = embedding_model or config["embedding_model"]
+    reducer = reducer or config["reducer"]
+    reduced_dim = reduced_dim or config["reduced_dim"]
+    if quantization not in QUANTIZATION_LEVELS:
+        typer.secho(
+            f"Unknown quantization: {quantization}. Use one of: {', '.join(QUANTIZATION_LEVELS)}",
+            fg=typer.colors.RED,
+            bold=True,
+        )
+        return
+    # The embedded Qdrant always searches the full vectors, only the flat store keeps quantized codes
+    if quantization != "none" and config["vector_store_backend"] != "flat":
+        message = (
+            f"Quantization needs the flat vector store, the {config['vector_store_backend']} backend ignores it. "
+            "Set `vector_store_backend` to flat in the config to use it."
+        )
+        if requested_quantization:
+            typer.secho(message, fg=typer.colors.RED, bold=True)
+            return
+        typer.secho(message + " Indexing without quantization.", fg=typer.colors.YELLOW)
+        quantization = "none"
+    try:
+        dim = embedding_dimension(embedding_model)
+    except ValueError:
+        typer.secho(f"Unknown embedding model: {embedding_model}", fg=typer.colors.RED, bold=True)
+        return
+    if reducer not in REDUCERS:
+        typer.secho(f"Unknown reducer: {reducer}. Use one of: {', '.join(REDUCERS)}", fg=typer.colors.RED, bold=True)
+        return
+    if reducer == "truncate" and embedding_model not in MATRYOSHKA_MODELS:
+        typer.secho(
+            f"{embedding_model} is not Matryoshka-trained, so truncating its vectors loses recall. "
+            "Use --reducer pca, or one of: " + ", ".join(sorted(MATRYOSHKA_MODELS)),
+            fg=typer.colors.RED,
+            bold=True,
+        )
+        return
+    if reducer != "none" and not 0 < reduced_dim < dim:
+        typer.secho(f"The reduced dimension must be between 1 and {dim - 1}", fg=typer.colors.RED, bold=True)
+        return
+    vector_reducer = VectorReducer(reducer, reduced_dim) if reducer != "none" else None
+    stored_reducer = load_collection_info(collection_name).get("reducer") or {}
+
+    # Local directories are re-indexed incrementally against the manifest of the previous run,
+    # unless the collection has to be rebuilt with a different model, quantization or reducer
+    incremental = (
+        path
+        and os.path.isdir(path)
+        and exists_qdrant_db(collection_name)
+        and load_manifest(collection_name) is not None
+        and collection_embedding_model(collection_name) == embedding_model
+        and load_collection_info(collection_name).get("quantization", "none") == quantization
+        and (stored_reducer.get("kind", "none"), stored_reducer.get("dim"))
+        == (reducer, reduced_dim if vector_reducer else None)
+    )
+
+    files = None
+    documents = []
+    reader = FileReader()
+    if incremental:
+        pass
+    elif link:
+        data, metadata = crawl_website(link)
+        documents = zip(data, metadata)
+    elif path and os.path.isdir(path):
+        _, _, _, files = diff_source(None, os.path.abspath(path))
+        documents = iter_files(list(files), reader=reader)
+    else:
+        data, metadata = crawl_files(path)
+        documents = zip(data or [], metadata or [])
 
     console = Console()
     with Live(
@@ -89,77 +435,110 @@ def create_local_qdrant_db(collection_name="test", link=None, path=None):
         console=console,
         transient=True,
     ) as live:
-        # For each data chunk it based on number of tokens
-        final_data, final_metadata, vectors = [], [], []
-        for dat, meta in zip(data, metadata):
-            live.update(
-                Panel(
-                    f"Embedding: {meta['source']}",
-                    title="[bold green]Indexer[/bold green]",
-                    border_style="green",
-                ),
-                refresh=True,
-            )
-            chunk_data, chunk_meta, chunk_vec = _chunk_data(dat, meta)
-            final_data.extend(chunk_data)
-            final_metadata.extend(chunk_meta)
-            vectors.extend(chunk_vec)
-
-        live.update(
-            Panel(
-                "Creating Index...",
-                title="[bold green]Indexer[/bold green]",
-                border_style="green",
-            ),
-            refresh=True,
+        if incremental:
+            changes = sync_local_qdrant_db(collection_name, path, workers=workers, live=live)
+            embed_stats = changes["stats"]
+        else:
+            # A source re-created after switching `vector_store_backend` moves to the new backend
+            store = get_vector_store(collection_name)
+            if store.name != config["vector_store_backend"]:
+                try:
+                    if store.has_collection(collection_name):
+                        store.delete_collection(collection_name)
+                finally:
+                    store.close()
+                store = get_vector_store()
+            chunk_store = None
+            try:
+                # Without a manifest an interrupted rebuild is redone in full on the next run,
+                # instead of syncing against files the recreated collection no longer holds
+                delete_manifest(collection_name)
+                stored_dim = vector_reducer.dim if vector_reducer else dim
+                store.create_collection(collection_name, stored_dim, quantization=quantization)
+                save_collection_info(
+                    collection_name,
+                    {
+                        "backend": store.name,
+                        "model": embedding_model,
+                        "dim": stored_dim,
+                        "quantization": quantization,
+                        "reducer": vector_reducer.info() if vector_reducer else None,
+                    },
+                )
+                chunk_store = open_chunk_store(collection_name)
+                chunk_store.clear()
+                embed_stats = index_documents(
+                    store,
+                    collection_name,
+                    documents,
+                    workers=workers,
+                    chunk_store=chunk_store,
+                    embedding_model_id=embedding_model,
+                    reducer=vector_reducer,
+                    live=live,
+                )
+            finally:
+                if chunk_store is not None:
+                    chunk_store.close()
+                store.close()
+            if vector_reducer is not None:
+                save_reducer(collection_name, vector_reducer)
+            calibrate_collection(collection_name)
+
+    if incremental:
+        typer.secho(
+            f"{len(changes['added'])} added, {len(changes['modified'])} modified, "
+            f"{len(changes['removed'])} removed, {changes['unchanged']} unchanged files",
+            fg=typer.colors.GREEN,
         )
-
-        qdrant_client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=768, distance=Distance.COSINE),
-        )
-
-        for vector, f_metadata in zip(vectors, final_metadata):
-            filepath = f_metadata["source"]
-
-            live.update(
-                Panel(
-                    f"Indexing: {filepath}",
-                    title="[bold green]Indexer[/bold green]",
-                    border_style="green",
-                ),
-                refresh=True,
-            )
-
-            qdrant_client.upsert(
-                collection_name=collection_name,
-                points=[PointStruct(vector=vector, payload=f_metadata, id=uuid.uuid4().hex)],
-            )
+        skipped = changes["skipped"]
+    else:
+        skipped = reader.summary()
+        if files is not None:
+            save_manifest(collection_name, files)
+    if skipped:
+        typer.secho(skipped, fg=typer.colors.YELLOW)
 
     typer.secho(f"Created Source: {collection_name}", fg=typer.colors.GREEN, bold=True)
+    typer.secho(
+        f"Embedded {embed_stats['chunks']} chunks in {embed_stats['seconds']:.1f}s "
+        f"({embed_stats['chunks_per_second']:.1f} chunks/sec, batch size {embed_stats['batch_size']}, "
+        f"{embed_stats['workers']} workers)",
+        fg=typer.colors.GREEN,
+    )
+    if embed_stats["duplicates"]:
+        typer.secho(
+            f"Skipped {embed_stats['duplicates']} duplicate chunks ({embed_stats['exact_duplicates']} exact, "
+            f"{embed_stats['near_duplicates']} near)",
+            fg=typer.colors.GREEN,
+        )
+    reducer_info = load_collection_info(collection_name).get("reducer")
+    if reducer_info and reducer_info["recall"] is not None:
+        typer.secho(
+            f"Stored {reducer_info['dim']}-dim vectors ({reducer_info['kind']}): recall@10 "
+            f"{reducer_info['recall']:.3f} against full vectors on {reducer_info.get('recall_size')} sampled chunks",
+            fg=typer.colors.GREEN,
+        )
+    if report_memory and embed_stats["peak_rss"] is not None:
+        message = f"Peak memory (RSS): {embed_stats['peak_rss'] / 1024 / 1024:.1f} MB in the main process"
+        if embed_stats["peak_worker_rss"]:
+            message += f", {embed_stats['peak_worker_rss'] / 1024 / 1024:.1f} MB in the largest embedding worker"
+        typer.secho(message, fg=typer.colors.GREEN)
 
     set_sources()
-    return qdrant_client
 
 
 def list_remote_qdrant_db():
     json_data = {
         "user_id": keyring.get_password(SERVICE_ID, "user_id"),
     }
-    response = requests.post(VECTORDB_LIST_ENDPOINT, json=json_data, headers=get_headers())
+    response = http_client.post(VECTORDB_LIST_ENDPOINT, json=json_data, headers=get_headers(), idempotent=True)
     response.raise_for_status()  # Raise an exception if the request failed
     return response.json()
 
 
 def list_local_qdrant_db():
-    QDRANT_JSON_PATH = os.path.join(PACKAGE_DIR, "meta.json")
-    if os.path.exists(QDRANT_JSON_PATH):
-        with open(QDRANT_JSON_PATH) as json_file:
-            collection = json.load(json_file)
-            collection_names = list(collection["collections"].keys())
-    else:
-        collection_names = []
-    return collection_names
+    return _list_qdrant_collections() + FlatVectorStore().list_collections()
 
 
 def remote_qdrant_search(source_name, user_input, data=None, metadata=None):
@@ -170,60 +549,227 @@ def remote_qdrant_search(source_name, user_input, data=None, metadata=None):
         "data": data,
         "metadata": metadata,
     }
-    response = requests.post(VECTORDB_SEARCH_ENDPOINT, json=json_data, headers=get_headers())
+    response = http_client.post(
+        VECTORDB_SEARCH_ENDPOINT, json=json_data, headers=get_headers(), compress=True, idempotent=True
+    )
     response.raise_for_status()  # Raise an exception if the request failed
-    set_sources()
     return response.json()
 
 
-def local_qdrant_search(source_name, user_input):
-    qdrant_client = get_local_qdrant_db()
-
-    query_vector = local_get_embedding([user_input])[0]
+def _search_collection(source_name, query_vector, limit):
+    reducer = load_reducer(source_name)
+    if reducer is not None:
+        if not reducer.fitted:
+            return []
+        query_vector = reducer.transform(query_vector)
+
+    store = get_vector_store(source_name)
+    try:
+        hits = store.search(source_name, query_vector, limit=limit)
+    finally:
+        store.close()
+    return [{"score": hit["score"], "payload": hit["payload"], "collection": source_name} for hit in hits]
+
+
+def _embedding_space(collection_name):
+    # Cosine scores are only comparable between collections with the same model and reducer
+    reducer = load_collection_info(collection_name).get("reducer") or {}
+    return collection_embedding_model(collection_name), reducer.get("kind"), reducer.get("dim")
+
+
+def _score_calibration(vectors):
+    """Mean and standard deviation of the cosine scores between distinct pairs of `vectors`."""
+    vectors = normalize(vectors)
+    scores = (vectors @ vectors.T)[np.triu_indices(len(vectors), k=1)]
+    return {"mean": float(scores.mean()), "std": float(max(scores.std(), 1e-6)), "samples": len(vectors)}
+
+
+def calibrate_collection(collection_name):
+    """Record what unrelated chunks of a local collection score against each other.
+
+    Two random chunks of a source are rarely about the same thing, so the scores
+    between a sample of its chunks show what an irrelevant hit scores in the
+    collection's embedding space. The calibration is saved with the collection
+    info and returned, or None if the collection has too few chunks.
+    """
+    store = get_vector_store(collection_name)
+    try:
+        payloads = [
+            payload
+            for _, payload in itertools.islice(
+                store.scroll(collection_name, fields=["data", "text_id"]), 10 * CALIBRATION_SAMPLE
+            )
+        ]
+    finally:
+        store.close()
+    if len(payloads) > CALIBRATION_SAMPLE:
+        rng = np.random.default_rng(0)
+        payloads = [payloads[i] for i in rng.choice(len(payloads), CALIBRATION_SAMPLE, replace=False)]
+    hits = load_hit_texts([{"payload": dict(payload), "collection": collection_name} for payload in payloads])
+    texts = [hit["payload"]["data"] for hit in hits if hit["payload"].get("data")]
+    if len(texts) < MIN_CALIBRATION_SAMPLE:
+        return None
+
+    vectors = local_get_embedding(texts, collection_embedding_model(collection_name), as_numpy=True)
+    reducer = load_reducer(collection_name)
+    if reducer is not None and reducer.fitted:
+        vectors = reducer.transform(vectors)
+    calibration = _score_calibration(vectors)
+    info = load_collection_info(collection_name)
+    info["calibration"] = calibration
+    save_collection_info(collection_name, info)
+    return calibration
+
+
+def _normalize_scores(hits_by_space, calibrations):
+    """Put the scores of several embedding spaces on one scale.
+
+    A score counts by how far it stands above the scores of unrelated chunks in
+    its space, in units of their spread (see `calibrate_collection`), so a hit
+    keeps its relevance however the other spaces score. These standardized
+    scores are mapped back onto the mean calibration to stay on the cosine
+    scale. Spaces without a calibration keep their scores. The original score is
+    kept as `raw_score`.
+    """
+    calibrated = {space: calibrations[space] for space in hits_by_space if calibrations.get(space)}
+    if not calibrated:
+        return
+    mean = np.mean([calibration["mean"] for calibration in calibrated.values()])
+    std = np.mean([calibration["std"] for calibration in calibrated.values()])
+    for space, calibration in calibrated.items():
+        for hit in hits_by_space[space]:
+            z = (hit["score"] - calibration["mean"]) / calibration["std"]
+            hit["raw_score"], hit["score"] = hit["score"], float(mean + z * std)
+
+
+def _space_calibrations(spaces):
+    # Collections indexed before calibrations were recorded are calibrated on their first mixed search
+    calibrations = {}
+    for source_name, space in spaces.items():
+        calibration = load_collection_info(source_name).get("calibration")
+        if calibration is None:
+            try:
+                calibration = calibrate_collection(source_name)
+            except Exception:
+                calibration = None
+        if calibration is not None:
+            calibrations.setdefault(space, []).append(calibration)
+    return {
+        space: {
+            "mean": float(np.mean([calibration["mean"] for calibration in space_calibrations])),
+            "std": float(np.mean([calibration["std"] for calibration in space_calibrations])),
+        }
+        for space, space_calibrations in calibrations.items()
+    }
 
-    hits = qdrant_client.search(
-        limit=5,
-        collection_name=source_name,
-        query_vector=query_vector,
-    )
-    hits = [{"score": hit.score, "payload": hit.payload} for hit in hits]
-    return hits
 
+def local_qdrant_multi_search(source_names, user_input, limit=5, top_k=None):
+    """Search several local sources for `user_input` at once.
+
+    The query is embedded once per embedding model, the sources are searched
+    for `limit` hits each and the best `top_k` hits overall (all of them by
+    default) are merged with a bounded heap. Only sources in the flat store are
+    searched concurrently, the embedded Qdrant runs one call at a time. Sources with different
+    embedding models or reducers score in different spaces, so their scores are
+    calibrated first. Returns a dict with the `hits` (best first), the search
+    `timings` per source and the `embedding_timings` per model, in seconds.
+    """
+    models, spaces = {}, {}
+    for source_name in source_names:
+        models.setdefault(collection_embedding_model(source_name), []).append(source_name)
+        spaces[source_name] = _embedding_space(source_name)
+
+    query_vectors, embedding_timings = {}, {}
+    for model in models:
+        start_time = time.perf_counter()
+        query_vectors[model] = local_get_embedding([user_input], model, as_numpy=True)[0]
+        embedding_timings[model] = time.perf_counter() - start_time
+
+    def timed_search(source_name, query_vector):
+        start_time = time.perf_counter()
+        hits = _search_collection(source_name, query_vector, limit)
+        return hits, time.perf_counter() - start_time
+
+    top_k = top_k or limit * len(source_names)
+    hits_by_space, timings = {}, {}
+    # Embedded Qdrant runs every call on its owner thread, so more threads would only wait on it
+    parallel = sum(FlatVectorStore.collection_exists(source_name) for source_name in source_names)
+    with ThreadPoolExecutor(max_workers=min(parallel, 8) or 1) as executor:
+        futures = {
+            source_name: executor.submit(timed_search, source_name, query_vectors[model])
+            for model, names in models.items()
+            for source_name in names
+        }
+        for source_name, future in futures.items():
+            try:
+                hits, timings[source_name] = future.result()
+            except Exception:
+                typer.secho(f"Failed to search in source: {source_name}", fg=typer.colors.RED, bold=True)
+                continue
+            hits_by_space.setdefault(spaces[source_name], []).extend(hits)
+
+    if len(hits_by_space) > 1:
+        _normalize_scores(hits_by_space, _space_calibrations(spaces))
+
+    # Entries are (score, tiebreak, hit) so that equal scores never compare the hit dicts
+    heap, tiebreak = [], itertools.count()
+    for hit in itertools.chain.from_iterable(hits_by_space.values()):
+        entry = (hit["score"], next(tiebreak), hit)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    return {
+        "hits": [hit for _, _, hit in sorted(heap, reverse=True)],
+        "timings": timings,
+        "embedding_timings": embedding_timings,
+    }
 
-def transient_qdrant_search(user_input, data, metadata):
-    qdrant_client = QdrantClient(location=":memory:")
-    collection_name = str(uuid.uuid4().hex)
 
-    search_vector = local_get_embedding([user_input])[0]
+def local_qdrant_search(source_name, user_input):
+    return local_qdrant_multi_search([source_name], user_input)["hits"]
+
+
+def load_hit_texts(hits):
+    """Fill in the `data` of local hits whose chunk text lives in the chunk store of their collection."""
+    text_ids_by_collection = {}
+    for hit in hits:
+        if "data" not in hit["payload"] and "text_id" in hit["payload"]:
+            text_ids_by_collection.setdefault(hit["collection"], set()).add(hit["payload"]["text_id"])
+
+    for collection_name, text_ids in text_ids_by_collection.items():
+        chunk_store = open_chunk_store(collection_name)
+        texts = chunk_store.get_many(text_ids)
+        chunk_store.close()
+        for hit in hits:
+            if hit.get("collection") == collection_name and "data" not in hit["payload"]:
+                hit["payload"]["data"] = texts.get(hit["payload"].get("text_id"), "")
+    return hits
 
-    qdrant_client.recreate_collection(
-        collection_name=collection_name, vectors_config=VectorParams(size=768, distance=Distance.COSINE)
-    )
 
-    final_data, final_metadata, vectors = [], [], []
-    for dat, meta in zip(data, metadata):
-        chunk_data, chunk_meta, chunk_vec = _chunk_data(dat, meta)
-        final_data.extend(chunk_data)
-        final_metadata.extend(chunk_meta)
-        vectors.extend(chunk_vec)
-
-    qdrant_client.upsert(
-        collection_name=collection_name,
-        points=[
-            PointStruct(vector=vector, payload=f_metadata, id=uuid.uuid4().hex)
-            for vector, f_metadata in zip(vectors, final_metadata)
-        ],
-    )
+def build_transient_index(data, metadata, embedding_model=None):
+    """Embed documents that are not a saved source into an in-memory store; returns (store, collection_name).
 
-    limit = 20
+    The vectors are searched by brute force with NumPy unless there are more than
+    `transient_qdrant_threshold` of them, in which case they move to an in-memory Qdrant.
+    """
+    config = load_config()
+    embedding_model = embedding_model or config["embedding_model"]
+    dim = embedding_dimension(embedding_model)
+    store = MemoryVectorStore()
+    collection_name = str(uuid.uuid4().hex)
+    store.create_collection(collection_name, dim)
+    index_documents(store, collection_name, zip(data, metadata), embedding_model_id=embedding_model)
 
-    hits = qdrant_client.search(
-        collection_name=collection_name,
-        query_vector=search_vector,
-        limit=limit,
-    )
-    hits = [{"score": hit.score, "payload": hit.payload} for hit in hits]
-    return hits
+    if store.count(collection_name) > config["transient_qdrant_threshold"]:
+        ids, payloads, vectors = store.vectors(collection_name)
+        qdrant = QdrantVectorStore(QdrantClient(location=":memory:"))
+        qdrant.create_collection(collection_name, dim)
+        qdrant.upsert(collection_name, zip(ids, vectors, payloads))
+        store.close()
+        store = qdrant
+    return store, collection_name
 
 
 def delete_remote_qdrant_db(collection_name="test"):
@@ -231,13 +777,18 @@ def delete_remote_qdrant_db(collection_name="test"):
         "user_id": keyring.get_password(SERVICE_ID, "user_id"),
         "collection_name": collection_name,
     }
-    response = requests.post(VECTORDB_DELETE_ENDPOINT, json=json_data, headers=get_headers())
+    response = http_client.post(VECTORDB_DELETE_ENDPOINT, json=json_data, headers=get_headers(), idempotent=True)
     response.raise_for_status()  # Raise an exception if the request failed
     set_sources()
     return response.json()
 
 
 def delete_local_qdrant_db(collection_name="test"):
-    qdrant_client = get_local_qdrant_db()
-    qdrant_client.delete_collection(collection_name=collection_name)
+    store = get_vector_store(collection_name)
+    try:
+        if store.has_collection(collection_name):
+            store.delete_collection(collection_name)
+    finally:
+        store.close()
+    delete_source_dir(collection_name)
     set_sources()
@@ -1,12 +1,11 @@
 import json
 
-import requests
 import typer
 from rich.console import Console
 from rich.live import Live
 from rich.panel import Panel
 
-from ...constants import WEB_SCRAPE_EXTRACT_ENDPOINT, WEB_SCRAPE_LINKS_ENDPOINT, get_headers
+from ...constants import WEB_SCRAPE_EXTRACT_ENDPOINT, WEB_SCRAPE_LINKS_ENDPOINT, get_headers, http_client
 from .custom_inputs import input_or_timeout
 
 console = Console()
@@ -82,8 +81,12 @@ def crawl_website(start_url):
             auto_refresh=True,
             vertical_overflow="visible",
         ) as live:
-            response = requests.post(
-                WEB_SCRAPE_LINKS_ENDPOINT, json={"urls": [start_url]}, headers=get_headers(), stream=True
+            response = http_client.post(
+                WEB_SCRAPE_LINKS_ENDPOINT,
+                json={"urls": [start_url]},
+                headers=get_headers(),
+                stream=True,
+                idempotent=True,
             )
             if response.status_code == 200:
                 for chunk in response.iter_lines():
@@ -115,8 +118,12 @@ def crawl_website(start_url):
         auto_refresh=True,
         vertical_overflow="visible",
     ) as live:
-        response = requests.post(
-            WEB_SCRAPE_EXTRACT_ENDPOINT, json={"urls": list(visited_links)}, headers=get_headers(), stream=True
+        response = http_client.post(
+            WEB_SCRAPE_EXTRACT_ENDPOINT,
+            json={"urls": list(visited_links)},
+            headers=get_headers(),
+            stream=True,
+            idempotent=True,
         )
         if response.status_code == 200:
             for chunk in response.iter_lines():
@@ -150,7 +157,9 @@ def extract_from_url(url, live=None):
             )
         )
 
-    response = requests.post(WEB_SCRAPE_EXTRACT_ENDPOINT, json={"urls": [url]}, headers=get_headers())
+    response = http_client.post(
+        WEB_SCRAPE_EXTRACT_ENDPOINT, json={"urls": [url]}, headers=get_headers(), idempotent=True
+    )
     json_data = response.json()
 
     source, url_data = (
@@ -31,6 +31,145 @@ FINETUNE_CREATE_ENDPOINT = "https://mirageml--finetune-create-model.modal.run"
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Responses that are retried, and the request bodies big enough to be worth compressing
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+COMPRESS_MIN_BYTES = 16 * 1024
+
+
+class HTTPClient:
+    """Shared session for the remote endpoints.
+
+    Connections are kept alive in a pool per host. Idempotent calls (GET and friends, or any
+    call made with `idempotent=True`) are retried on failed connections and 429/5xx responses
+    up to `retries` times (the `http_retries` config key) with jittered exponential backoff.
+    Other calls are only retried when the server cannot have acted on them: on a connect
+    timeout or a 429. A response that already started streaming is never replayed. Calls made with
+    `compress=True` gzip JSON bodies over COMPRESS_MIN_BYTES when `http_compress_requests` is set.
+    `stats()` reports the latency per endpoint, up to the response headers for streamed calls.
+    """
+
+    def __init__(self, retries=None, compress=None, backoff=0.5, max_backoff=8.0, pool_size=10):
+        import threading
+
+        self._retries = retries
+        self._compress = compress
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _settings(self):
+        if self._retries is None or self._compress is None:
+            from .commands.config import load_config
+
+            config = load_config()
+            self._retries = config["http_retries"] if self._retries is None else self._retries
+            self._compress = config["http_compress_requests"] if self._compress is None else self._compress
+        return self._retries, self._compress
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def _encode(self, json_data, headers, compress):
+        import gzip
+        import json
+
+        body = json.dumps(json_data).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+        if compress and len(body) >= COMPRESS_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body
+
+    def _delay(self, attempt, response=None):
+        import random
+
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def _record(self, url, elapsed, retried=False, failed=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                url, {"requests": 0, "retries": 0, "failures": 0, "total_time": 0.0, "max_time": 0.0}
+            )
+            stats["requests"] += 1
+            stats["retries"] += retried
+            stats["failures"] += failed
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def request(self, method, url, json=None, headers=None, compress=False, retries=None, idempotent=None, **kwargs):
+        import time
+
+        import requests
+
+        default_retries, compress_requests = self._settings()
+        retries = default_retries if retries is None else retries
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retried_errors = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectTimeout,)
+        retried_codes = RETRY_STATUS_CODES if idempotent else (429,)
+        headers = dict(headers or {})
+        if json is not None:
+            kwargs["data"] = self._encode(json, headers, compress and compress_requests)
+
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = isinstance(e, retried_errors) and attempt < retries
+                self._record(url, time.perf_counter() - start, retried=retry, failed=True)
+                if not retry:
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+
+            retry = response.status_code in retried_codes and attempt < retries
+            self._record(url, time.perf_counter() - start, retried=retry, failed=response.status_code >= 400)
+            if not retry:
+                return response
+            delay = self._delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+
+    def post(self, url, json=None, headers=None, **kwargs):
+        return self.request("POST", url, json=json, headers=headers, **kwargs)
+
+    def get(self, url, headers=None, **kwargs):
+        return self.request("GET", url, headers=headers, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                url: dict(stats, mean_time=stats["total_time"] / stats["requests"])
+                for url, stats in self._stats.items()
+            }
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+http_client = HTTPClient()
+
 
 def fetch_new_access_token():
     import keyring
@@ -0,0 +1,25 @@
+import uuid
+
+from mirageml.commands.utils.chunk_store import ChunkStore
+
+
+def _count(store):
+    return store._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def test_upserting_a_point_again_does_not_keep_its_text(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    first, second = uuid.uuid4().hex, uuid.uuid4().hex
+    (text_id,) = store.put_many([first], ["shared"])
+    store.put_many([second], ["shared"])
+    # Stored again without a delete first, as after an interrupted sync
+    store.put_many([first], ["shared"])
+    store.put_many([first], ["edited"])
+
+    store.release([second])
+    assert store.get_many([text_id]) == {}
+    assert _count(store) == 1
+
+    store.release([first])
+    assert _count(store) == 0
+    store.close()
@@ -0,0 +1,18 @@
+import pytest
+
+from mirageml.commands.utils.chunking import chunk_offsets, code_chunk_offsets
+
+
+def test_chunks_overlap_by_overlap_tokens():
+    text = " ".join(f"word{i}" for i in range(100))
+    chunks = chunk_offsets(text, max_tokens=30, overlap_tokens=5)
+    assert len(chunks) > 1 and chunks[-1][1] == len(text)
+    assert all(start < previous_end for (_, previous_end), (start, _) in zip(chunks, chunks[1:]))
+
+
+@pytest.mark.parametrize("overlap_tokens", [10, 11, -1])
+def test_overlap_must_be_below_max_tokens(overlap_tokens):
+    with pytest.raises(ValueError):
+        chunk_offsets("some text", max_tokens=10, overlap_tokens=overlap_tokens)
+    with pytest.raises(ValueError):
+        code_chunk_offsets("x = 1", max_tokens=10, overlap_tokens=overlap_tokens)
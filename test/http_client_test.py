@@ -0,0 +1,99 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mirageml.commands.utils import vectordb
+from mirageml.constants import COMPRESS_MIN_BYTES, HTTPClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request with its first status in `server.replies[path]`, then with 200."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.server.received.append((self.path, self.headers.get("Content-Encoding"), json.loads(body)))
+        replies = self.server.replies.get(self.path, [])
+        status = replies.pop(0) if replies else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.received, server.replies = [], {}
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient(retries=3, compress=True, backoff=0.001)
+    yield client
+    client.close()
+
+
+def test_idempotent_calls_are_retried(server, client):
+    server.replies["/search"] = [503, 502]
+
+    response = client.post(server.url + "/search", json={"q": 1}, idempotent=True)
+
+    assert response.status_code == 200
+    assert len(server.received) == 3
+    assert client.stats()[server.url + "/search"]["retries"] == 2
+
+
+def test_other_calls_are_not_replayed_after_a_server_error(server, client):
+    server.replies["/create"] = [503]
+
+    response = client.post(server.url + "/create", json={"q": 1})
+
+    assert response.status_code == 503
+    assert len(server.received) == 1
+
+
+def test_other_calls_are_retried_when_rate_limited(server, client):
+    server.replies["/create"] = [429]
+
+    assert client.post(server.url + "/create", json={"q": 1}).status_code == 200
+    assert len(server.received) == 2
+
+
+def test_large_bodies_are_gzipped(server, client):
+    large = {"data": "x" * COMPRESS_MIN_BYTES}
+    client.post(server.url, json=large, compress=True)
+    client.post(server.url, json={"data": "small"}, compress=True)
+    client.post(server.url, json=large)
+
+    assert [encoding for _, encoding, _ in server.received] == ["gzip", None, None]
+    assert server.received[0][2] == large
+
+
+def test_web_collection_create_is_never_retried(server, client, monkeypatch):
+    server.replies["/create-web-collection"] = [429, 503]
+    monkeypatch.setattr(vectordb, "http_client", client)
+    monkeypatch.setattr(vectordb, "VECTORDB_CREATE_WEB_COLLECTION", server.url + "/create-web-collection")
+    monkeypatch.setattr(vectordb, "get_headers", lambda: {})
+    monkeypatch.setattr(vectordb.keyring, "get_password", lambda *args: "user")
+    monkeypatch.setattr(vectordb, "set_sources", lambda: None)
+
+    vectordb.create_remote_qdrant_db("docs", link="https://example.com")
+
+    assert len(server.received) == 1
@@ -0,0 +1,55 @@
+import numpy as np
+
+from mirageml.commands.utils import vectordb
+
+# A small model whose unrelated chunks score about 0.1 and a large one whose chunks all score about 0.6
+SPACES = {
+    "docs": ("BAAI/bge-small-en-v1.5", None, None),
+    "vendored": ("BAAI/bge-base-en-v1.5", None, None),
+}
+CALIBRATIONS = {
+    "docs": {"mean": 0.1, "std": 0.05, "samples": 64},
+    "vendored": {"mean": 0.6, "std": 0.05, "samples": 64},
+}
+
+
+def _hits(collection_name, scores):
+    return [{"score": score, "payload": {}, "collection": collection_name} for score in scores]
+
+
+def test_score_calibration_measures_background_scores():
+    rng = np.random.default_rng(0)
+    spread = rng.standard_normal((64, 128))
+    shared = spread + 2 * rng.standard_normal(128)
+
+    assert abs(vectordb._score_calibration(spread)["mean"]) < 0.05
+    assert vectordb._score_calibration(shared)["mean"] > 0.5
+
+
+def test_normalize_scores_keeps_relevance_across_spaces():
+    # The relevant source scores well above its background, the irrelevant one barely above its own
+    hits_by_space = {
+        SPACES["docs"]: _hits("docs", [0.45, 0.40, 0.30]),
+        SPACES["vendored"]: _hits("vendored", [0.66]),
+    }
+    calibrations = {SPACES[name]: calibration for name, calibration in CALIBRATIONS.items()}
+
+    vectordb._normalize_scores(hits_by_space, calibrations)
+
+    hits = sorted((hit for hits in hits_by_space.values() for hit in hits), key=lambda x: x["score"], reverse=True)
+    assert [hit["collection"] for hit in hits] == ["docs", "docs", "docs", "vendored"]
+    assert hits[-1]["raw_score"] == 0.66
+
+
+def test_multi_search_ranks_the_relevant_source_first(monkeypatch):
+    scores = {"docs": [0.45, 0.40, 0.30], "vendored": [0.66, 0.64, 0.63]}
+    monkeypatch.setattr(vectordb, "collection_embedding_model", lambda name: SPACES[name][0])
+    monkeypatch.setattr(vectordb, "_embedding_space", SPACES.__getitem__)
+    monkeypatch.setattr(vectordb, "local_get_embedding", lambda texts, model, as_numpy: np.zeros((1, 4)))
+    monkeypatch.setattr(vectordb, "_search_collection", lambda name, vector, limit: _hits(name, scores[name]))
+    monkeypatch.setattr(vectordb, "load_collection_info", lambda name: {"calibration": CALIBRATIONS[name]})
+    monkeypatch.setattr(vectordb.FlatVectorStore, "collection_exists", staticmethod(lambda name: False))
+
+    result = vectordb.local_qdrant_multi_search(["docs", "vendored"], "query", limit=3, top_k=3)
+
+    assert [hit["collection"] for hit in result["hits"]] == ["docs", "docs", "docs"]